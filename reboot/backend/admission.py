@@ -0,0 +1,259 @@
+"""
+Admission control for the CPU-heavy terrain routes.
+
+/api/terrain/generate, /preview and /preview/draft need no login and burn CPU
+on every request (as does a course bundle, which generates every hole of the
+course), so a crawler sweeping seeds could occupy every worker thread.
+AdmissionMiddleware guards them (and only them) with:
+
+  - a concurrency limit per route: requests over the limit are answered
+    503 immediately instead of queueing for a thread;
+  - a shared thread budget: together, the guarded routes never hold more
+    than the threadpool size minus ADMISSION_THREAD_RESERVE threads;
+  - a token bucket per client (user id when logged in, otherwise client IP):
+    ADMISSION_RATE requests per second with bursts of ADMISSION_BURST, over
+    which requests get 429;
+  - a priority lane: requests with a valid bearer token may use
+    ADMISSION_PRIORITY_RESERVE extra slots on each route, so players loading
+    a hole still get through while anonymous traffic has the route saturated.
+
+Thumbnails already persisted on disk cost nothing to serve, so /preview
+requests for them skip admission entirely: only real generation is limited.
+The defaults leave room for the holes page, which loads a page of 20
+thumbnails at once.
+
+Both rejections carry a Retry-After header. Everything else (login, play
+submission, sessions...) is never limited here, and thanks to the thread
+budget it always has at least ADMISSION_THREAD_RESERVE threads left.
+
+State lives in the worker process; nothing is shared between workers.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import time
+from typing import Callable, Optional
+from urllib.parse import parse_qs
+
+import anyio.to_thread
+from starlette.responses import JSONResponse
+
+import metrics
+from auth import decode_access_token
+from routes.terrain import thumbnail_path
+
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "true").lower() in ("true", "1", "yes")
+ADMISSION_RATE = float(os.environ.get("ADMISSION_RATE", "10"))
+ADMISSION_BURST = float(os.environ.get("ADMISSION_BURST", "60"))
+ADMISSION_PRIORITY_RESERVE = int(os.environ.get("ADMISSION_PRIORITY_RESERVE", "2"))
+ADMISSION_TRUST_PROXY = os.environ.get("ADMISSION_TRUST_PROXY", "false").lower() in ("true", "1", "yes")
+ADMISSION_THREAD_RESERVE = int(os.environ.get("ADMISSION_THREAD_RESERVE", "8"))
+ADMISSION_MAX_CLIENTS = 10000
+
+
+def _cached_thumbnail(scope) -> bool:
+    """True when a /preview request's PNG is already on disk."""
+    params = parse_qs(scope["query_string"].decode("latin-1"))
+    try:
+        seed = params["seed"][0]
+        width = int(params["width"][0])
+        height = int(params["height"][0])
+    except (KeyError, ValueError):
+        return False
+    # Same bounds as the route; anything else is left to its validation
+    if len(seed) != 8 or "/" in seed or not (5 <= width <= 100 and 5 <= height <= 100):
+        return False
+    return thumbnail_path(seed, width, height).exists()
+
+
+# (path pattern, limit name, max concurrent requests, bypass check); first match wins
+GUARDED_ROUTES: tuple[tuple[re.Pattern, str, int, Optional[Callable]], ...] = (
+    (re.compile(r"/api/terrain/preview/draft/?"), "terrain_draft",
+     int(os.environ.get("ADMISSION_DRAFT_CONCURRENCY", "2")), None),
+    (re.compile(r"/api/terrain/preview/?"), "terrain_preview",
+     int(os.environ.get("ADMISSION_PREVIEW_CONCURRENCY", "24")), _cached_thumbnail),
+    (re.compile(r"/api/terrain/generate/?"), "terrain_generate",
+     int(os.environ.get("ADMISSION_GENERATE_CONCURRENCY", "8")), None),
+    (re.compile(r"/api/courses/[^/]+/bundle/?"), "course_bundle",
+     int(os.environ.get("ADMISSION_BUNDLE_CONCURRENCY", "4")), None),
+)
+
+ADMITTED = metrics.counter(
+    "egolf_admission_admitted_total",
+    "Requests to guarded routes let through",
+    ("limit", "lane"),
+)
+BYPASSED = metrics.counter(
+    "egolf_admission_bypassed_total",
+    "Requests to guarded routes served from cache without admission",
+    ("limit",),
+)
+REJECTED = metrics.counter(
+    "egolf_admission_rejected_total",
+    "Requests to guarded routes rejected",
+    ("limit", "reason"),
+)
+IN_FLIGHT = metrics.gauge(
+    "egolf_admission_in_flight",
+    "Requests currently running on each guarded route",
+    ("limit",),
+)
+TRACKED_CLIENTS = metrics.gauge(
+    "egolf_admission_clients",
+    "Clients with a rate-limit bucket",
+)
+
+
+class TokenBuckets:
+    """Per-client token buckets; only used from the event loop, so no locking."""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = ADMISSION_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def take(self, client: str) -> float:
+        """Take a token. Returns 0 if allowed, else the seconds until one is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[client] = (tokens, now)
+            return (1 - tokens) / self.rate
+        if client not in self._buckets and len(self._buckets) >= self.max_clients:
+            self._prune(now)
+        self._buckets[client] = (tokens - 1, now)
+        return 0.0
+
+    def _prune(self, now: float) -> None:
+        # Buckets that have refilled completely carry no state worth keeping
+        full_after = self.burst / self.rate
+        self._buckets = {
+            client: (tokens, updated)
+            for client, (tokens, updated) in self._buckets.items()
+            if now - updated < full_after
+        }
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+_buckets = TokenBuckets(ADMISSION_RATE, ADMISSION_BURST)
+_in_flight: dict[str, int] = {name: 0 for _, name, _, _ in GUARDED_ROUTES}
+_total_in_flight = 0
+_thread_budget: Optional[int] = None
+
+
+def thread_budget() -> int:
+    """
+    Threads the guarded routes may hold together: the default threadpool's
+    size minus ADMISSION_THREAD_RESERVE. Call from the event loop; main's
+    lifespan calls it once so a bad setting fails at start-up.
+    """
+    global _thread_budget
+    if _thread_budget is None:
+        total = int(anyio.to_thread.current_default_thread_limiter().total_tokens)
+        if ADMISSION_THREAD_RESERVE >= total:
+            raise ValueError(
+                f"ADMISSION_THREAD_RESERVE={ADMISSION_THREAD_RESERVE} leaves none of the "
+                f"{total} threadpool threads to the guarded routes"
+            )
+        _thread_budget = total - ADMISSION_THREAD_RESERVE
+    return _thread_budget
+
+
+@metrics.register_collector
+def _collect_admission() -> None:
+    TRACKED_CLIENTS.set(len(_buckets))
+
+
+def _guarded_route(path: str) -> Optional[tuple[str, int, Optional[Callable]]]:
+    for pattern, name, limit, bypass in GUARDED_ROUTES:
+        if pattern.fullmatch(path):
+            return name, limit, bypass
+    return None
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _client_key(scope) -> tuple[str, bool]:
+    """Return (bucket key, authenticated) for a request."""
+    authorization = _header(scope, b"authorization")
+    if authorization and authorization[:7].lower() == "bearer ":
+        payload = decode_access_token(authorization[7:].strip())
+        if payload is not None:
+            return f"user:{payload.get('sub')}", True
+
+    # nginx sets X-Real-IP to the peer address, so unlike X-Forwarded-For
+    # it cannot be spoofed by the client
+    real_ip = _header(scope, b"x-real-ip") if ADMISSION_TRUST_PROXY else None
+    if real_ip:
+        return "ip:" + real_ip.strip(), False
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown"), False
+
+
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the limits above to GUARDED_ROUTES."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _total_in_flight
+        guarded = _guarded_route(scope["path"]) if scope["type"] == "http" and ADMISSION_ENABLED else None
+        if guarded is None:
+            await self.app(scope, receive, send)
+            return
+
+        name, limit, bypass = guarded
+        if bypass is not None and bypass(scope):
+            BYPASSED.inc(limit=name)
+            await self.app(scope, receive, send)
+            return
+
+        client, authenticated = _client_key(scope)
+
+        wait = _buckets.take(client)
+        if wait > 0:
+            REJECTED.inc(limit=name, reason="rate")
+            await _reject(429, "Too many requests, slow down", wait)(scope, receive, send)
+            return
+
+        budget = thread_budget()
+        if authenticated:
+            limit += ADMISSION_PRIORITY_RESERVE
+        else:
+            budget -= ADMISSION_PRIORITY_RESERVE
+        if _in_flight[name] >= limit or _total_in_flight >= budget:
+            REJECTED.inc(limit=name, reason="concurrency")
+            await _reject(503, "Server busy, please retry shortly", 1)(scope, receive, send)
+            return
+
+        ADMITTED.inc(limit=name, lane="priority" if authenticated else "anonymous")
+        _in_flight[name] += 1
+        _total_in_flight += 1
+        IN_FLIGHT.inc(limit=name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _in_flight[name] -= 1
+            _total_in_flight -= 1
+            IN_FLIGHT.dec(limit=name)
@@ -1,25 +1,58 @@
+import hashlib
 import os
-import bcrypt
+import time
 import jwt
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import hashing
+from cache import TTLCache
 from db import get_db
 
 JWT_SECRET = os.environ.get("JWT_SECRET", "dev-secret-change-me")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRY_HOURS = 24
 
+# Comma-separated usernames allowed to use the /api/admin endpoints
+ADMIN_USERNAMES = {
+    name.strip() for name in os.environ.get("ADMIN_USERNAMES", "").split(",") if name.strip()
+}
+
+# Authenticated requests are served from these caches instead of decoding the
+# JWT and querying `users` every time. Nothing in the app changes a user row
+# after signup, so a cached user can only go stale through an edit made
+# outside the app, which USER_CACHE_TTL bounds; a route that starts changing
+# user rows must call invalidate_user().
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", "300"))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "10000"))
+
+_user_cache = TTLCache("users", maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+_token_cache = TTLCache("tokens", maxsize=USER_CACHE_SIZE, ttl=JWT_EXPIRY_HOURS * 3600)
+
 security = HTTPBearer(auto_error=False)
 
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login attempts in progress, please retry shortly",
+        headers={"Retry-After": str(hashing.HASH_RETRY_AFTER)},
+    )
+
+
+async def hash_password(password: str) -> str:
+    try:
+        return await hashing.hash_password(password)
+    except hashing.PoolBusy:
+        raise _hashing_busy()
 
 
-def verify_password(password: str, password_hash: str) -> bool:
-    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+async def verify_password(password: str, password_hash: str) -> bool:
+    try:
+        return await hashing.verify_password(password, password_hash)
+    except hashing.PoolBusy:
+        raise _hashing_busy()
 
 
 def create_access_token(user_id: int, username: str) -> str:
@@ -33,13 +66,47 @@ def create_access_token(user_id: int, username: str) -> str:
 
 
 def decode_access_token(token: str) -> Optional[dict]:
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = _token_cache.get(key)
+    if payload is not None:
+        return dict(payload)
+
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
+    # Cache the decoded token until it expires
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = exp - time.time()
+        if ttl > 0:
+            _token_cache.set(key, dict(payload), ttl=ttl)
+    return payload
+
+
+def get_user(user_id: int) -> Optional[dict]:
+    """Return the public user record, served from the user cache when possible."""
+    user = _user_cache.get(user_id)
+    if user is None:
+        with get_db() as conn:
+            row = conn.execute(
+                "SELECT id, username, email, created_at FROM users WHERE id = ?",
+                (user_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        user = dict(row)
+        _user_cache.set(user_id, user)
+    return dict(user)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop a cached user record; must follow any change to the user's row."""
+    _user_cache.pop(user_id)
+
 
 def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
@@ -63,16 +130,7 @@ def get_current_user(
     except (ValueError, TypeError):
         return None
 
-    with get_db() as conn:
-        row = conn.execute(
-            "SELECT id, username, email, created_at FROM users WHERE id = ?",
-            (user_id,),
-        ).fetchone()
-
-    if row is None:
-        return None
-
-    return dict(row)
+    return get_user(user_id)
 
 
 def require_user(
@@ -85,3 +143,15 @@ def require_user(
             detail="Not authenticated",
         )
     return user
+
+
+def require_admin(
+    user: dict = Depends(require_user),
+) -> dict:
+    """Dependency that raises 403 unless the user is listed in ADMIN_USERNAMES."""
+    if user["username"] not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    return user
@@ -0,0 +1,406 @@
+"""
+Bulk import of holes and hole plays from NDJSON.
+
+Usage:
+    python bulk_import.py plays.ndjson            # Import a file
+    python bulk_import.py - < plays.ndjson        # Import from stdin
+    python bulk_import.py plays.ndjson --batch-size 20000
+
+The same importer backs the admin endpoint POST /api/admin/import.
+
+Each line is one JSON object:
+
+    {"type": "hole", "name": "...", "seed": "abcdefgh", "width": 20, "height": 30,
+     "author_name": "bob"}
+    {"type": "hole_play", "hole_seed": "abcdefgh", "hole_width": 20, "hole_height": 30,
+     "user_name": "bob", "created_at": "2024-01-01 12:00:00",
+     "moves": [{"from_x": 1, "from_y": 2, "to_x": 3, "to_y": 4}]}
+
+Lines without "type" are treated as plays, so the output of
+GET /api/holeplays/export can be imported as-is. Holes are matched by
+(seed, width, height) and users by user_name.
+
+Rows from the legacy Prisma app are accepted too: HolePlay with a `strokes`
+list of {startX, startY, endX, endY}, holeId, userId and createdAt. Their ids
+are the legacy app's, so they are only resolved through records earlier in the
+same import: a hole line with an "id", or a user line mapping a legacy id to
+an existing username:
+
+    {"type": "hole", "id": 17, "seed": "abcdefgh", "width": 20, "height": 30}
+    {"type": "user", "id": 4, "username": "bob"}
+
+Plays whose hole or user cannot be resolved are skipped; users are never
+created. Timestamps (created_at / createdAt) may be SQLite-style, ISO 8601
+("2024-01-01T12:00:00Z") or epoch milliseconds, and are stored as UTC
+"YYYY-MM-DD HH:MM:SS" like CURRENT_TIMESTAMP, so they sort and filter
+alongside rows written by the app.
+New holes get their terrain features indexed (hole_features); their terrain is
+generated before each batch's transaction, so the write lock is not held meanwhile.
+
+Plays are written in batches, one transaction per batch, with executemany.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Optional
+
+from db import get_connection, profile_pragmas, sqlite_timestamp
+from hole_features import feature_values, save_hole_features
+from terrain import generate_full_terrain
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 20
+
+
+def normalize_timestamp(value) -> Optional[str]:
+    """
+    SQLite CURRENT_TIMESTAMP form of an imported timestamp (None stays None).
+
+    Accepts epoch milliseconds (number or digit string) and ISO 8601 strings,
+    with "T" or a space, and "Z", an offset or nothing (taken as UTC).
+    Raises ValueError for anything else.
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"invalid timestamp: {value!r}")
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, (int, float)):
+        return sqlite_timestamp(datetime.fromtimestamp(value / 1000, tz=timezone.utc))
+    if not isinstance(value, str):
+        raise ValueError(f"invalid timestamp: {value!r}")
+    text = value.strip()
+    if text.endswith(("Z", "z")):
+        text = text[:-1] + "+00:00"
+    try:
+        return sqlite_timestamp(datetime.fromisoformat(text))
+    except ValueError:
+        raise ValueError(f"invalid timestamp: {value!r}") from None
+
+
+def _source_id(value):
+    """A usable source-system id (int or string), else None."""
+    if isinstance(value, (int, str)) and not isinstance(value, bool):
+        return value
+    return None
+
+
+class BulkImporter:
+    """Buffers parsed records and writes them in batched transactions."""
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        progress: Optional[Callable[[dict], None]] = None,
+    ):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.progress = progress
+        self.started = time.perf_counter()
+        self.line_no = 0
+        self.counts = {"holes": 0, "hole_plays": 0, "moves": 0, "skipped": 0}
+        self.errors: list[str] = []
+        self._holes: list[tuple[int, dict]] = []
+        self._plays: list[tuple[int, dict]] = []
+
+        # Natural keys -> ids, loaded once; both tables are small next to plays
+        self._hole_ids = {
+            (r["seed"], r["width"], r["height"]): r["id"]
+            for r in conn.execute("SELECT id, seed, width, height FROM holes")
+        }
+        self._known_hole_ids = set(self._hole_ids.values())
+        self._user_ids = {r["username"]: r["id"] for r in conn.execute("SELECT id, username FROM users")}
+        # Ids from the source system (legacy holeId / userId) -> ids here,
+        # filled from hole and user records of this import
+        self._source_hole_ids: dict = {}
+        self._source_user_ids: dict = {}
+
+    # --- Input ---
+
+    def add_lines(self, lines: Iterable) -> None:
+        for line in lines:
+            self.line_no += 1
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                self._skip(self.line_no, f"invalid JSON ({e})")
+                continue
+            self.add(record, self.line_no)
+
+    def add(self, record: dict, line_no: int = 0) -> None:
+        kind = record.get("type", "hole_play")
+        if kind == "user":
+            self._map_user(record, line_no)
+            return
+        if kind == "hole":
+            self._holes.append((line_no, record))
+        else:
+            self._plays.append((line_no, record))
+        if len(self._holes) + len(self._plays) >= self.batch_size:
+            self.flush()
+
+    # --- Output ---
+
+    def flush(self) -> None:
+        if not self._holes and not self._plays:
+            return
+        features = self._new_hole_features()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._holes:
+                self._write_holes(features)
+            if self._plays:
+                self._write_plays()
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self._holes = []
+            self._plays = []
+        if self.progress is not None:
+            self.progress(self.summary())
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            **self.counts,
+            "lines": self.line_no,
+            "seconds": round(elapsed, 3),
+            "plays_per_second": round(self.counts["hole_plays"] / elapsed, 1) if elapsed > 0 else 0.0,
+            "errors": self.errors,
+        }
+
+    # --- Internals ---
+
+    def _skip(self, line_no: int, reason: str) -> None:
+        self.counts["skipped"] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {line_no}: {reason}")
+
+    @staticmethod
+    def _hole_key(rec: dict) -> tuple[str, int, int]:
+        """(seed, width, height) of a hole record; ValueError if it is invalid."""
+        try:
+            seed = str(rec["seed"])
+            width, height = int(rec["width"]), int(rec["height"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("hole needs seed, width and height")
+        if len(seed) != 8 or not (5 <= width <= 100) or not (5 <= height <= 100):
+            raise ValueError("hole seed or dimensions out of range")
+        return seed, width, height
+
+    def _new_hole_features(self) -> dict:
+        """Feature values of the buffered holes not yet in the database, by key."""
+        features = {}
+        for _, rec in self._holes:
+            try:
+                key = self._hole_key(rec)
+            except ValueError:
+                continue  # reported by _write_holes
+            if key not in self._hole_ids and key not in features:
+                features[key] = feature_values(generate_full_terrain(*key))
+        return features
+
+    def _write_holes(self, features: dict) -> None:
+        rows = []
+        source_ids = []
+        for line_no, rec in self._holes:
+            try:
+                key = self._hole_key(rec)
+            except ValueError as e:
+                self._skip(line_no, str(e))
+                continue
+            try:
+                created_at = normalize_timestamp(rec.get("created_at", rec.get("createdAt")))
+            except ValueError as e:
+                self._skip(line_no, str(e))
+                continue
+            seed, width, height = key
+            if _source_id(rec.get("id")) is not None:
+                source_ids.append((rec["id"], key))
+            if key in self._hole_ids:
+                continue
+            self._hole_ids[key] = None  # claimed; id filled in below
+            author_id = self._resolve_user(rec.get("author_name"), rec.get("author_id"))
+            rows.append((rec.get("name") or seed, seed, width, height, author_id, created_at))
+
+        cursor = self.conn.executemany(
+            """
+            INSERT OR IGNORE INTO holes (name, seed, width, height, author_id, created_at)
+            VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+            """,
+            rows,
+        )
+        new_holes = self.conn.execute(
+            "SELECT id, seed, width, height FROM holes WHERE id > ?",
+            (max(self._known_hole_ids, default=0),),
+        ).fetchall()
+        new_features = []
+        for r in new_holes:
+            key = (r["seed"], r["width"], r["height"])
+            self._hole_ids[key] = r["id"]
+            self._known_hole_ids.add(r["id"])
+            if key in features:
+                new_features.append((r["id"], features[key]))
+        save_hole_features(self.conn, new_features)
+        for source_id, key in source_ids:
+            self._source_hole_ids[source_id] = self._hole_ids[key]
+        self.counts["holes"] += max(cursor.rowcount, 0)
+
+    def _map_user(self, rec: dict, line_no: int) -> None:
+        source_id = _source_id(rec.get("id"))
+        name = rec.get("username", rec.get("user_name"))
+        if source_id is None or name is None:
+            self._skip(line_no, "user needs id and username")
+        elif name not in self._user_ids:
+            self._skip(line_no, f"unknown user {name!r}")
+        else:
+            self._source_user_ids[source_id] = self._user_ids[name]
+
+    def _resolve_user(self, name, source_id) -> Optional[int]:
+        if name is not None:
+            return self._user_ids.get(name)
+        return self._source_user_ids.get(_source_id(source_id))
+
+    def _resolve_hole(self, rec: dict) -> Optional[int]:
+        seed = rec.get("hole_seed")
+        if seed is not None:
+            return self._hole_ids.get((seed, rec.get("hole_width"), rec.get("hole_height")))
+        return self._source_hole_ids.get(_source_id(rec.get("hole_id", rec.get("holeId"))))
+
+    def _write_plays(self) -> None:
+        # Ids are assigned here so moves can reference their play without a
+        # round trip per row; safe because BEGIN IMMEDIATE holds the write lock.
+        # hole_plays is AUTOINCREMENT, so ids of deleted plays (kept in
+        # sqlite_sequence) are never reused; inserting above the sequence
+        # advances it.
+        next_id = self.conn.execute(
+            """
+            SELECT MAX(
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'hole_plays'), 0),
+                COALESCE((SELECT MAX(id) FROM hole_plays), 0)
+            ) + 1
+            """
+        ).fetchone()[0]
+        plays = []
+        moves = []
+        for line_no, rec in self._plays:
+            hole_id = self._resolve_hole(rec)
+            if hole_id is None:
+                self._skip(line_no, "unknown hole")
+                continue
+            user_id = self._resolve_user(rec.get("user_name"), rec.get("user_id", rec.get("userId")))
+            if user_id is None:
+                self._skip(line_no, "unknown user")
+                continue
+
+            raw_moves = rec.get("moves")
+            if raw_moves is None and isinstance(rec.get("strokes"), list):
+                # Legacy Prisma HolePlay.strokes
+                raw_moves = [
+                    {"from_x": s["startX"], "from_y": s["startY"], "to_x": s["endX"], "to_y": s["endY"]}
+                    for s in rec["strokes"]
+                ]
+            try:
+                play_moves = [
+                    (next_id, i, int(m["from_x"]), int(m["from_y"]), int(m["to_x"]), int(m["to_y"]))
+                    for i, m in enumerate(raw_moves or [])
+                ]
+            except (KeyError, TypeError, ValueError):
+                self._skip(line_no, "malformed moves")
+                continue
+
+            try:
+                created_at = normalize_timestamp(rec.get("created_at", rec.get("createdAt")))
+            except ValueError as e:
+                self._skip(line_no, str(e))
+                continue
+
+            plays.append((next_id, hole_id, user_id, len(play_moves), created_at))
+            moves.extend(play_moves)
+            next_id += 1
+
+        self.conn.executemany(
+            """
+            INSERT INTO hole_plays (id, hole_id, user_id, strokes, created_at)
+            VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+            """,
+            plays,
+        )
+        self.conn.executemany(
+            """
+            INSERT INTO hole_play_moves (hole_play_id, move_order, from_x, from_y, to_x, to_y)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            moves,
+        )
+        self.counts["hole_plays"] += len(plays)
+        self.counts["moves"] += len(moves)
+
+
+def open_import_connection(check_same_thread: bool = True) -> sqlite3.Connection:
+    """Connection tuned for bulk writes; transactions are managed by BulkImporter."""
+    conn = get_connection(check_same_thread=check_same_thread)
+    conn.isolation_level = None
+    for pragma in profile_pragmas("throughput"):
+        conn.execute(pragma)
+    return conn
+
+
+def _print_progress(summary: dict) -> None:
+    print(
+        f"  {summary['hole_plays']} plays, {summary['moves']} moves, {summary['holes']} holes "
+        f"({summary['plays_per_second']:.0f} plays/s)"
+    )
+
+
+def main(argv: list[str]) -> None:
+    if not argv or argv[0] in ("-h", "--help"):
+        print(__doc__)
+        sys.exit(0 if argv else 1)
+
+    path = argv[0]
+    batch_size = DEFAULT_BATCH_SIZE
+    if "--batch-size" in argv:
+        batch_size = int(argv[argv.index("--batch-size") + 1])
+
+    conn = open_import_connection()
+    try:
+        importer = BulkImporter(conn, batch_size=batch_size, progress=_print_progress)
+        print(f"Importing {path}...")
+        if path == "-":
+            importer.add_lines(sys.stdin)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                importer.add_lines(f)
+        importer.flush()
+    finally:
+        conn.close()
+
+    summary = importer.summary()
+    print(
+        f"Done: {summary['hole_plays']} plays, {summary['moves']} moves, {summary['holes']} holes "
+        f"in {summary['seconds']}s ({summary['plays_per_second']:.0f} plays/s), "
+        f"{summary['skipped']} skipped."
+    )
+    for error in summary["errors"]:
+        print(f"  {error}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
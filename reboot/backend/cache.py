@@ -0,0 +1,85 @@
+"""
+Small in-process caches.
+
+TTLCache is a thread-safe LRU whose entries also expire after a time-to-live.
+Every cache gets a name and reports hits, misses and size through /api/metrics
+as egolf_cache_{hits,misses}_total{cache="..."} and egolf_cache_entries.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import metrics
+
+CACHE_HITS = metrics.counter("egolf_cache_hits_total", "Cache lookups that found a live entry", ("cache",))
+CACHE_MISSES = metrics.counter("egolf_cache_misses_total", "Cache lookups that missed or found an expired entry", ("cache",))
+CACHE_ENTRIES = metrics.gauge("egolf_cache_entries", "Entries currently held in each cache", ("cache",))
+
+_MISSING = object()
+
+_caches: list["TTLCache"] = []
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry time-to-live (in seconds)."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        _caches.append(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                expires_at, value = item
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    CACHE_HITS.inc(cache=self.name)
+                    return value
+                del self._data[key]
+            self.misses += 1
+        CACHE_MISSES.inc(cache=self.name)
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value; `ttl` overrides the cache default for this entry."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@metrics.register_collector
+def _collect_cache_sizes() -> None:
+    for cache in _caches:
+        CACHE_ENTRIES.set(len(cache), cache=cache.name)
@@ -1,23 +1,90 @@
 import sqlite3
 import os
 from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import metrics
 
 DB_PATH = os.environ.get("DATABASE_PATH", os.path.join(os.path.dirname(__file__), "egolf.db"))
 
+# Pragma presets applied to every connection. "balanced" suits the app: WAL
+# with synchronous=NORMAL cannot corrupt the database, it can only lose the
+# last transactions on power loss. cache_size is in KiB, mmap_size in MiB.
+PRAGMA_PROFILES = {
+    "safe": {"synchronous": "FULL", "cache_size": 2048, "mmap_size": 0, "busy_timeout": 5000},
+    "balanced": {"synchronous": "NORMAL", "cache_size": 16384, "mmap_size": 128, "busy_timeout": 5000},
+    "throughput": {"synchronous": "NORMAL", "cache_size": 65536, "mmap_size": 512, "busy_timeout": 10000},
+}
+DB_PROFILE = os.environ.get("DB_PROFILE", "balanced").lower()
+if DB_PROFILE not in PRAGMA_PROFILES:
+    raise ValueError(f"Invalid DB_PROFILE: {DB_PROFILE} (expected one of: {', '.join(PRAGMA_PROFILES)})")
+_profile = PRAGMA_PROFILES[DB_PROFILE]
+DB_SYNCHRONOUS = os.environ.get("DB_SYNCHRONOUS", _profile["synchronous"]).upper()
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", str(_profile["cache_size"])))
+DB_MMAP_SIZE_MB = int(os.environ.get("DB_MMAP_SIZE_MB", str(_profile["mmap_size"])))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", str(_profile["busy_timeout"])))
+
+if DB_SYNCHRONOUS not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+    raise ValueError(f"Invalid DB_SYNCHRONOUS: {DB_SYNCHRONOUS}")
+
+
+
+def _tuning_pragmas(synchronous: str, cache_size_kb: int, mmap_size_mb: int, busy_timeout_ms: int) -> tuple[str, ...]:
+    return (
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA cache_size=-{cache_size_kb}",
+        f"PRAGMA mmap_size={mmap_size_mb * 1024 * 1024}",
+        f"PRAGMA busy_timeout={busy_timeout_ms}",
+    )
+
+
+def profile_pragmas(name: str) -> tuple[str, ...]:
+    """PRAGMA statements applying one of PRAGMA_PROFILES to a connection."""
+    profile = PRAGMA_PROFILES[name]
+    return _tuning_pragmas(profile["synchronous"], profile["cache_size"], profile["mmap_size"], profile["busy_timeout"])
 
-def get_connection() -> sqlite3.Connection:
-    """Create a new SQLite connection with row factory enabled."""
-    conn = sqlite3.connect(DB_PATH)
+
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA foreign_keys=ON",
+) + _tuning_pragmas(DB_SYNCHRONOUS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE_MB, DB_BUSY_TIMEOUT_MS)
+
+CONNECTIONS_OPENED = metrics.counter(
+    "egolf_db_connections_opened_total",
+    "SQLite connections opened",
+)
+CONNECTIONS_IN_USE = metrics.gauge(
+    "egolf_db_connections_in_use",
+    "SQLite connections currently checked out through get_db()",
+)
+
+
+def get_connection(check_same_thread: bool = True) -> sqlite3.Connection:
+    """Create a new SQLite connection with row factory enabled.
+
+    Pass check_same_thread=False for connections handed from thread to thread
+    (e.g. by a streaming response); they must still never be used concurrently.
+    """
+    conn = sqlite3.connect(DB_PATH, check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    CONNECTIONS_OPENED.inc()
     return conn
 
 
+def sqlite_timestamp(value: datetime) -> str:
+    """Format a datetime like SQLite's CURRENT_TIMESTAMP (UTC, no offset)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
 @contextmanager
 def get_db():
     """Context manager that yields a connection and auto-commits/rollbacks."""
     conn = get_connection()
+    CONNECTIONS_IN_USE.inc()
     try:
         yield conn
         conn.commit()
@@ -26,3 +93,4 @@ def get_db():
         raise
     finally:
         conn.close()
+        CONNECTIONS_IN_USE.dec()
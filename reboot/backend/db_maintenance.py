@@ -0,0 +1,118 @@
+"""
+Background SQLite maintenance, started from main.lifespan.
+
+Every DB_MAINTENANCE_INTERVAL seconds the task:
+  - checks the size of the -wal file and, above DB_WAL_CHECKPOINT_MB, runs a
+    PASSIVE checkpoint (copies what it can without blocking anyone), or a
+    TRUNCATE checkpoint above DB_WAL_TRUNCATE_MB (waits up to a second for
+    readers, then shrinks the file back to zero; retried next time if busy);
+  - runs `PRAGMA optimize` every DB_OPTIMIZE_INTERVAL seconds (and once at
+    start-up), which refreshes planner statistics only for tables that need it.
+
+The work runs in a thread so the event loop never waits on SQLite. With
+several workers each runs its own task; concurrent checkpoints are harmless,
+the losers just report "busy".
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+import metrics
+from db import DB_PATH, get_connection
+
+DB_MAINTENANCE_ENABLED = os.environ.get("DB_MAINTENANCE_ENABLED", "true").lower() in ("true", "1", "yes")
+DB_MAINTENANCE_INTERVAL = float(os.environ.get("DB_MAINTENANCE_INTERVAL", "30"))
+DB_OPTIMIZE_INTERVAL = float(os.environ.get("DB_OPTIMIZE_INTERVAL", "3600"))
+DB_WAL_CHECKPOINT_MB = float(os.environ.get("DB_WAL_CHECKPOINT_MB", "16"))
+DB_WAL_TRUNCATE_MB = float(os.environ.get("DB_WAL_TRUNCATE_MB", "64"))
+# How long a TRUNCATE checkpoint may wait for readers; writers queue behind it
+CHECKPOINT_BUSY_TIMEOUT_MS = 1000
+
+logger = logging.getLogger(__name__)
+
+WAL_BYTES = metrics.gauge("egolf_db_wal_bytes", "Size of the SQLite -wal file at the last maintenance check")
+CHECKPOINT_SECONDS = metrics.histogram(
+    "egolf_db_checkpoint_seconds",
+    "Duration of WAL checkpoints run by the maintenance task",
+    ("mode",),
+)
+CHECKPOINTS = metrics.counter(
+    "egolf_db_checkpoints_total",
+    "WAL checkpoints run by the maintenance task",
+    ("mode", "result"),
+)
+OPTIMIZE_SECONDS = metrics.histogram(
+    "egolf_db_optimize_seconds",
+    "Duration of PRAGMA optimize runs",
+)
+
+
+def wal_size() -> int:
+    try:
+        return os.path.getsize(DB_PATH + "-wal")
+    except OSError:
+        return 0
+
+
+def checkpoint(mode: str) -> bool:
+    """Run a WAL checkpoint; returns False if it could not complete (busy)."""
+    conn = get_connection()
+    try:
+        conn.execute(f"PRAGMA busy_timeout={CHECKPOINT_BUSY_TIMEOUT_MS}")
+        with CHECKPOINT_SECONDS.time(mode=mode.lower()):
+            busy, _, _ = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    finally:
+        conn.close()
+    CHECKPOINTS.inc(mode=mode.lower(), result="busy" if busy else "ok")
+    return not busy
+
+
+def optimize() -> None:
+    conn = get_connection()
+    try:
+        with OPTIMIZE_SECONDS.time():
+            # Bounded sampling keeps ANALYZE cheap on large tables
+            conn.execute("PRAGMA analysis_limit=400")
+            conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+
+
+def run_once(run_optimize: bool) -> None:
+    size = wal_size()
+    WAL_BYTES.set(size)
+    if size > DB_WAL_TRUNCATE_MB * 1024 * 1024:
+        checkpoint("TRUNCATE")
+    elif size > DB_WAL_CHECKPOINT_MB * 1024 * 1024:
+        checkpoint("PASSIVE")
+    if run_optimize:
+        optimize()
+    WAL_BYTES.set(wal_size())
+
+
+async def run() -> None:
+    """Maintenance loop; cancel the task to stop it."""
+    last_optimize = 0.0
+    while True:
+        due = not last_optimize or time.monotonic() - last_optimize >= DB_OPTIMIZE_INTERVAL
+        try:
+            await asyncio.to_thread(run_once, due)
+            if due:
+                last_optimize = time.monotonic()
+        except Exception:
+            # Never let one failure (locked file, OSError on the size check...)
+            # end the task: log it and try again next interval
+            logger.exception("SQLite maintenance failed")
+        await asyncio.sleep(DB_MAINTENANCE_INTERVAL)
+
+
+def start() -> Optional[asyncio.Task]:
+    """Start the maintenance task on the running loop (None when disabled)."""
+    if not DB_MAINTENANCE_ENABLED:
+        return None
+    return asyncio.create_task(run(), name="db-maintenance")
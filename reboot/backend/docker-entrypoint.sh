@@ -0,0 +1,9 @@
+#!/bin/sh
+# Container start-up: schema first, then data migrations in the background
+# (chunked, so the app can serve meanwhile), then the app itself.
+set -e
+
+python migrate.py --schema
+python migrate.py --data &
+
+exec uvicorn main:app --host 0.0.0.0 --port 8000
@@ -0,0 +1,29 @@
+"""
+Fast JSON responses for hot list endpoints.
+
+FastAPI normally builds a Pydantic model per row, then validates and
+serializes it again through `response_model`. For list endpoints the rows come
+straight from SQLite with already-correct types, so they are turned into plain
+dicts shaped exactly like the schemas in schemas.py and encoded once.
+
+Routes keep their `response_model` so the OpenAPI docs are unchanged; returning
+a Response instance makes FastAPI skip the validation step.
+"""
+
+import json
+from typing import Any
+
+from fastapi import Response
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode to compact UTF-8 JSON, matching JSONResponse's output."""
+    return _encoder.encode(obj).encode("utf-8")
+
+
+class RawJSONResponse(Response):
+    """JSON response whose body is already-encoded bytes."""
+
+    media_type = "application/json"
@@ -0,0 +1,162 @@
+"""
+bcrypt hashing on a dedicated, bounded process pool.
+
+bcrypt costs 100-300 ms of CPU per call. Running it inline in /login and
+/signup lets a burst of logins occupy every request thread, so the work is
+sent to a process pool instead. The functions here are coroutines that await
+the pool's future, so a pending hash holds no request thread at all: however
+deep the queue, the threadpool that serves sync routes is left alone. At most
+HASH_WORKERS + HASH_QUEUE_DEPTH hashes may be pending at once; past that,
+callers get PoolBusy immediately and the routes answer 503 with a Retry-After
+header.
+
+If a worker process dies, the pool is broken for good; it is then discarded
+and replaced, and the hash retried once on the new pool (503 if that fails
+too).
+
+Set HASH_WORKERS=0 to hash in a thread of this process instead (still
+bounded), e.g. for single-core containers or local debugging.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import BrokenExecutor
+from typing import TYPE_CHECKING, Optional
+
+import bcrypt
+
+import metrics
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", str(min(os.cpu_count() or 1, 4))))
+HASH_QUEUE_DEPTH = int(os.environ.get("HASH_QUEUE_DEPTH", "32"))
+HASH_RETRY_AFTER = int(os.environ.get("HASH_RETRY_AFTER", "1"))
+
+QUEUE_SECONDS = metrics.histogram(
+    "egolf_password_hash_queue_seconds",
+    "Time a password hash waited for a free worker",
+    ("op",),
+)
+HASH_SECONDS = metrics.histogram(
+    "egolf_password_hash_seconds",
+    "Time spent inside bcrypt",
+    ("op",),
+)
+PENDING = metrics.gauge(
+    "egolf_password_hash_pending",
+    "Password hashes queued or running",
+)
+REJECTED = metrics.counter(
+    "egolf_password_hash_rejected_total",
+    "Password hashes rejected because the queue was full or the pool was down",
+    ("op",),
+)
+POOL_RESTARTS = metrics.counter(
+    "egolf_password_hash_pool_restarts_total",
+    "Hashing pools discarded after a worker process died",
+)
+
+
+class PoolBusy(Exception):
+    """Raised when the hashing queue is full (or the pool keeps breaking)."""
+
+
+_slots = threading.BoundedSemaphore(max(HASH_WORKERS, 1) + HASH_QUEUE_DEPTH)
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Imported here: multiprocessing is only needed once someone logs in
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawn: forking a process that already runs threads is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next call starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+            POOL_RESTARTS.inc()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown() -> None:
+    """Stop the worker processes (called on app shutdown)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+# --- Worker side (must stay top-level so they can be pickled) ---
+
+def _hashpw(submitted_at: float, password: bytes, rounds: int) -> tuple[bytes, float, float]:
+    started_at = time.time()
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+    return hashed, started_at - submitted_at, time.time() - started_at
+
+
+def _checkpw(submitted_at: float, password: bytes, hashed: bytes) -> tuple[bool, float, float]:
+    started_at = time.time()
+    ok = bcrypt.checkpw(password, hashed)
+    return ok, started_at - submitted_at, time.time() - started_at
+
+
+async def _submit(op: str, fn, *args):
+    # BrokenExecutor is the base of BrokenProcessPool; catching it avoids
+    # importing concurrent.futures.process before the pool is needed
+    for _ in range(2):
+        executor = _get_executor()
+        try:
+            return await asyncio.wrap_future(executor.submit(fn, time.time(), *args))
+        except BrokenExecutor:
+            _discard_executor(executor)
+    REJECTED.inc(op=op)
+    raise PoolBusy(op)
+
+
+async def _run(op: str, fn, *args):
+    if not _slots.acquire(blocking=False):
+        REJECTED.inc(op=op)
+        raise PoolBusy(op)
+    PENDING.inc()
+    try:
+        if HASH_WORKERS > 0:
+            result, waited, elapsed = await _submit(op, fn, *args)
+        else:
+            result, waited, elapsed = await asyncio.to_thread(fn, time.time(), *args)
+    finally:
+        PENDING.dec()
+        _slots.release()
+    QUEUE_SECONDS.observe(max(waited, 0.0), op=op)
+    HASH_SECONDS.observe(elapsed, op=op)
+    return result
+
+
+async def hash_password(password: str) -> str:
+    hashed = await _run("hash", _hashpw, password.encode("utf-8"), BCRYPT_ROUNDS)
+    return hashed.decode("utf-8")
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await _run("verify", _checkpw, password.encode("utf-8"), password_hash.encode("utf-8"))
@@ -0,0 +1,51 @@
+"""
+Storage for precomputed terrain features (the hole_features table).
+
+Rows are written when a hole is created or imported, and backfilled for
+older holes by migrations/004_backfill_hole_features.py. See
+terrain.compute_terrain_features for what each column means.
+"""
+
+import sqlite3
+from typing import Iterable, Optional
+
+from terrain import FEATURES_VERSION, compute_terrain_features
+
+FEATURE_COLUMNS = (
+    "grass_fraction",
+    "fairway_fraction",
+    "sand_fraction",
+    "tree_fraction",
+    "water_fraction",
+    "distance",
+    "par",
+    "obstacle_density",
+)
+
+_INSERT = f"""
+    INSERT OR REPLACE INTO hole_features (hole_id, version, {", ".join(FEATURE_COLUMNS)})
+    VALUES (?, ?, {", ".join("?" for _ in FEATURE_COLUMNS)})
+"""
+
+
+def feature_values(data: dict) -> tuple:
+    """
+    (version, *FEATURE_COLUMNS) for a generate_full_terrain() result.
+
+    Generating the terrain this needs is the slow part; do it before taking
+    the write lock, then pass the values to save_hole_features.
+    """
+    features = compute_terrain_features(data)
+    return (FEATURES_VERSION, *(features[c] for c in FEATURE_COLUMNS))
+
+
+def save_hole_features(conn: sqlite3.Connection, rows: Iterable[tuple[int, tuple]]) -> None:
+    """Store (hole_id, feature_values()) pairs. Only writes: no terrain work."""
+    conn.executemany(_INSERT, [(hole_id, *values) for hole_id, values in rows])
+
+
+def features_from_row(row) -> Optional[dict]:
+    """Features dict from a row joined with hole_features, or None if it has none."""
+    if row["par"] is None:
+        return None
+    return {c: row[c] for c in FEATURE_COLUMNS}
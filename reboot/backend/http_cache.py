@@ -0,0 +1,139 @@
+"""
+HTTP caching helpers: strong ETags, 304 handling and pre-compressed bodies.
+
+EncodedBody holds a response body together with its ETag and lazily built
+gzip/brotli variants, so a hot entry kept in a cache is compressed once and
+then served as-is. respond() turns one into a Response for a given request,
+answering 304 when the client already has it.
+
+Brotli is used when the optional `brotli` package is installed; otherwise
+clients get gzip.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+from typing import Optional
+
+from fastapi import Request, Response
+
+import metrics
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+NOT_MODIFIED = metrics.counter(
+    "egolf_http_not_modified_total",
+    "Conditional requests answered with 304 Not Modified",
+)
+
+
+def make_etag(data: bytes) -> str:
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+class EncodedBody:
+    """A response body, its strong ETag, and cached compressed variants."""
+
+    __slots__ = ("body", "etag", "_encoded")
+
+    def __init__(self, body: bytes, etag: Optional[str] = None):
+        self.body = body
+        self.etag = etag or make_etag(body)
+        self._encoded: dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == "br":
+                data = brotli.compress(self.body, quality=5)
+            else:
+                data = gzip.compress(self.body, compresslevel=6, mtime=0)
+            self._encoded[encoding] = data
+        return data
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        # Each representation gets its own strong validator
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+
+def _accepted_encodings(request: Request) -> set[str]:
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        token, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if token:
+            accepted.add(token.lower())
+    return accepted
+
+
+def choose_encoding(request: Request, size: int) -> Optional[str]:
+    if size < COMPRESS_MIN_SIZE:
+        return None
+    accepted = _accepted_encodings(request)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match matches any representation of `etag`."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    base = etag.strip('"')
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate == base or candidate.rsplit("-", 1)[0] == base:
+            return True
+    return False
+
+
+def not_modified_response(etag: str, cache_control: str) -> Response:
+    NOT_MODIFIED.inc()
+    return Response(status_code=304, headers={
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    })
+
+
+def respond(
+    request: Request,
+    entry: EncodedBody,
+    cache_control: str,
+    media_type: str = "application/json",
+) -> Response:
+    """Serve `entry` with validators, honouring If-None-Match and Accept-Encoding."""
+    if is_not_modified(request, entry.etag):
+        return not_modified_response(entry.etag, cache_control)
+
+    encoding = choose_encoding(request, len(entry.body))
+    headers = {
+        "ETag": entry.etag_for(encoding),
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if encoding is None:
+        body = entry.body
+    else:
+        body = entry.encoded(encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=media_type, headers=headers)
@@ -0,0 +1,349 @@
+"""
+Load generator simulating concurrent players.
+
+Usage:
+    python loadtest.py --spawn                          # Start a throwaway local server
+    python loadtest.py --url http://127.0.0.1:8000      # Hit a running instance
+    python loadtest.py --spawn --players 50 --duration 60 --arrival-rate 5 \\
+        --mix list_holes=3,terrain=4,preview=1,draft=1,play=2 --output run.json
+
+Each virtual player signs up, logs in and creates a hole, then keeps picking
+actions from the weighted mix until the run ends:
+
+    list_holes   GET  /api/holes
+    terrain      GET  /api/terrain/generate
+    preview      GET  /api/terrain/preview
+    draft        GET  /api/terrain/preview/draft (the hole editor's live preview)
+    play         GET  /api/holes/{id} and its terrain, then POST /api/holeplays
+
+Players arrive at --arrival-rate per second (0 = all at once). The report
+(JSON, printed or written to --output) has throughput, error rates and
+p50/p95/p99 latency per endpoint, so runs can be diffed.
+
+--spawn starts `uvicorn main:app` on a free port against a temporary database,
+thumbnail directory and terrain store (with admission control off), so
+nothing but this repo is needed and nothing is left behind. Only the standard library is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = "list_holes=3,terrain=4,preview=1,draft=1,play=2"
+ACTIONS = ("list_holes", "terrain", "preview", "draft", "play")
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class Stats:
+    """Latencies and error counts per endpoint, shared by all players."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+
+    def record(self, endpoint: str, seconds: float, status: int) -> None:
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            codes = self.statuses.setdefault(endpoint, {})
+            codes[str(status)] = codes.get(str(status), 0) + 1
+            if status == 0 or status >= 400:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        total = errors = 0
+        for endpoint in sorted(self.latencies):
+            values = sorted(self.latencies[endpoint])
+            count = len(values)
+            errs = self.errors.get(endpoint, 0)
+            total += count
+            errors += errs
+            endpoints[endpoint] = {
+                "requests": count,
+                "errors": errs,
+                "error_rate": round(errs / count, 4),
+                "rps": round(count / elapsed, 2),
+                "mean_ms": round(sum(values) / count * 1000, 2),
+                "p50_ms": round(_percentile(values, 50) * 1000, 2),
+                "p95_ms": round(_percentile(values, 95) * 1000, 2),
+                "p99_ms": round(_percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+                "statuses": self.statuses[endpoint],
+            }
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "requests": total,
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+class Player:
+    """One virtual player with its own keep-alive connection."""
+
+    def __init__(self, host: str, port: int, stats: Stats, rng: random.Random):
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.rng = rng
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+        self.token = None
+        self.hole_ids: list[int] = []
+
+    def request(self, endpoint: str, method: str, path: str, body=None):
+        headers = {"Accept-Encoding": "gzip"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        start = time.perf_counter()
+        status = 0
+        data = b""
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+            encoding = response.getheader("Content-Encoding")
+        except (OSError, http.client.HTTPException):
+            # Drop the broken connection; the next request reconnects
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            encoding = None
+        self.stats.record(endpoint, time.perf_counter() - start, status)
+
+        if status and 200 <= status < 300 and data and "json" in (response.getheader("Content-Type") or ""):
+            if encoding == "gzip":
+                data = gzip.decompress(data)
+            return status, json.loads(data)
+        return status, None
+
+    def random_seed(self) -> str:
+        return "".join(self.rng.choices(string.ascii_lowercase + string.digits, k=8))
+
+    def setup(self) -> bool:
+        name = "lt_" + "".join(self.rng.choices(string.ascii_lowercase + string.digits, k=12))
+        status, _ = self.request("POST /api/auth/signup", "POST", "/api/auth/signup", {
+            "username": name, "email": f"{name}@loadtest.local", "password": "loadtest",
+        })
+        if status != 201:
+            return False
+        status, body = self.request("POST /api/auth/login", "POST", "/api/auth/login", {
+            "username": name, "password": "loadtest",
+        })
+        if status != 200:
+            return False
+        self.token = body["access_token"]
+
+        status, body = self.request("POST /api/holes", "POST", "/api/holes", {
+            "name": f"Load test {name}", "seed": self.random_seed(),
+            "width": self.rng.randint(15, 30), "height": self.rng.randint(20, 40),
+        })
+        if status == 201:
+            self.hole_ids.append(body["id"])
+        return True
+
+    def list_holes(self) -> None:
+        _, body = self.request("GET /api/holes", "GET", "/api/holes?page=0&limit=20")
+        if body:
+            self.hole_ids = [h["id"] for h in body["holes"]] or self.hole_ids
+
+    def terrain(self) -> None:
+        w, h = self.rng.randint(10, 40), self.rng.randint(10, 60)
+        self.request("GET /api/terrain/generate", "GET",
+                     f"/api/terrain/generate?seed={self.random_seed()}&width={w}&height={h}")
+
+    def preview(self) -> None:
+        w, h = self.rng.randint(10, 30), self.rng.randint(10, 40)
+        self.request("GET /api/terrain/preview", "GET",
+                     f"/api/terrain/preview?seed={self.random_seed()}&width={w}&height={h}")
+
+    def draft(self) -> None:
+        w, h = self.rng.randint(10, 30), self.rng.randint(10, 40)
+        self.request("GET /api/terrain/preview/draft", "GET",
+                     f"/api/terrain/preview/draft?seed={self.random_seed()}&width={w}&height={h}")
+
+    def play(self) -> None:
+        if not self.hole_ids:
+            self.list_holes()
+            if not self.hole_ids:
+                return
+        hole_id = self.rng.choice(self.hole_ids)
+        _, hole = self.request("GET /api/holes/{hole_id}", "GET", f"/api/holes/{hole_id}")
+        if not hole:
+            return
+        _, terrain = self.request(
+            "GET /api/terrain/generate", "GET",
+            f"/api/terrain/generate?seed={hole['seed']}&width={hole['width']}&height={hole['height']}",
+        )
+        if not terrain:
+            return
+        # A straight-line walk from the ball to the hole, a few tiles per stroke
+        (x, y), (hx, hy) = terrain["ball_position"], terrain["hole_position"]
+        moves = []
+        while (x, y) != (hx, hy) and len(moves) < 50:
+            nx = x + max(-4, min(4, hx - x))
+            ny = y + max(-4, min(4, hy - y))
+            moves.append({"from_x": x, "from_y": y, "to_x": nx, "to_y": ny})
+            x, y = nx, ny
+        self.request("POST /api/holeplays", "POST", "/api/holeplays", {"hole_id": hole_id, "moves": moves})
+
+    def run(self, deadline: float, mix: list[tuple[str, float]], think_time: float) -> None:
+        if not self.setup():
+            return
+        actions = [a for a, _ in mix]
+        weights = [w for _, w in mix]
+        while time.monotonic() < deadline:
+            getattr(self, self.rng.choices(actions, weights)[0])()
+            if think_time > 0:
+                time.sleep(self.rng.uniform(0, 2 * think_time))
+        self.conn.close()
+
+
+def parse_mix(text: str) -> list[tuple[str, float]]:
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ACTIONS:
+            raise SystemExit(f"Unknown action in --mix: {name} (expected one of {', '.join(ACTIONS)})")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(workers: int) -> tuple[subprocess.Popen, str, str]:
+    """
+    Start uvicorn on a free port with its own database, thumbnail directory
+    and terrain store, so a run leaves nothing behind in the real ones.
+    Admission control is off: it would answer most of the load with 429/503.
+    """
+    tmpdir = tempfile.mkdtemp(prefix="egolf-loadtest-")
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DATABASE_PATH": os.path.join(tmpdir, "loadtest.db"),
+        "TERRAIN_CACHE_DIR": os.path.join(tmpdir, "terrain_cache"),
+        "TERRAIN_STORE_PATH": os.path.join(tmpdir, "terrain_store.db"),
+        "ADMISSION_ENABLED": "false",
+        "BCRYPT_ROUNDS": os.environ.get("BCRYPT_ROUNDS", "4"),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/health")
+            if conn.getresponse().status == 200:
+                return proc, url, tmpdir
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise SystemExit("Server did not start")
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Simulate concurrent eGolf players.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the API")
+    parser.add_argument("--spawn", action="store_true", help="Start a local uvicorn with a temp database")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when spawning")
+    parser.add_argument("--players", type=int, default=20, help="Number of virtual players")
+    parser.add_argument("--duration", type=float, default=30, help="Run length in seconds")
+    parser.add_argument("--arrival-rate", type=float, default=0, help="Players arriving per second (0 = all at once)")
+    parser.add_argument("--think-time", type=float, default=0.1, help="Mean pause between actions, in seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted action mix")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    proc = tmpdir = None
+    url = args.url
+    if args.spawn:
+        proc, url, tmpdir = spawn_server(args.workers)
+    parsed = urlparse(url)
+    host, port = parsed.hostname, parsed.port or 80
+
+    stats = Stats()
+    master = random.Random(args.seed)
+    started = time.monotonic()
+    deadline = started + args.duration
+    threads = []
+    try:
+        for i in range(args.players):
+            if args.arrival_rate > 0 and i:
+                time.sleep(1 / args.arrival_rate)
+                if time.monotonic() >= deadline:
+                    break
+            player = Player(host, port, stats, random.Random(master.random()))
+            t = threading.Thread(target=player.run, args=(deadline, mix, args.think_time), daemon=True)
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    report = {
+        "config": {
+            "url": url, "players": args.players, "duration": args.duration,
+            "arrival_rate": args.arrival_rate, "think_time": args.think_time,
+            "mix": dict(mix), "seed": args.seed,
+        },
+        **stats.report(time.monotonic() - started),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Report written to {args.output}: {report['requests']} requests, "
+              f"{report['rps']} req/s, {report['errors']} errors")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
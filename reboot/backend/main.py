@@ -1,19 +1,40 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
+import admission
+from admission import AdmissionMiddleware
+import db_maintenance
+import hashing
+import http_cache
+import metrics
 from migrate import run_all as run_migrations
-from routes import auth, holes, holeplays, terrain
+from profiling import ProfilingMiddleware
+from routes import admin, auth, courses, holes, holeplays, sessions, terrain
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Run pending migrations on startup
-    run_migrations()
+    # Apply pending SQL migrations on startup (skipped quickly when up to date);
+    # data migrations are deferred to `python migrate.py --data`
+    run_migrations(quick=True)
+    maintenance = db_maintenance.start()
+    # Fails fast if ADMISSION_THREAD_RESERVE leaves the terrain routes nothing
+    admission.thread_budget()
     yield
+    if maintenance is not None:
+        maintenance.cancel()
+    hashing.shutdown()
+    terrain.shutdown_pool()
 
 
 app = FastAPI(title="eGolf API", version="0.1.0", lifespan=lifespan)
 
+# Load shedding for the CPU-heavy terrain routes — added first so CORS
+# headers are set on its 429/503 responses too
+app.add_middleware(AdmissionMiddleware)
+
 # CORS — allow the Vue dev server
 app.add_middleware(
     CORSMiddleware,
@@ -23,13 +44,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress other large responses (bodies that already carry a
+# Content-Encoding, like cached terrain, are passed through untouched)
+app.add_middleware(GZipMiddleware, minimum_size=http_cache.COMPRESS_MIN_SIZE)
+
+# Opt-in request profiling (no-op unless PROFILE_ENABLED is set)
+app.add_middleware(ProfilingMiddleware)
+
+# Request metrics — added last so it wraps everything else
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Mount route modules
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(holes.router, prefix="/api/holes", tags=["holes"])
+app.include_router(courses.router, prefix="/api/courses", tags=["courses"])
 app.include_router(holeplays.router, prefix="/api/holeplays", tags=["holeplays"])
+app.include_router(sessions.router, prefix="/api/sessions", tags=["sessions"])
 app.include_router(terrain.router, prefix="/api/terrain", tags=["terrain"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 
 @app.get("/api/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/api/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
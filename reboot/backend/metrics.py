@@ -0,0 +1,297 @@
+"""
+In-process metrics registry, rendered in the Prometheus text format.
+
+Metrics are created once at import time with counter() / gauge() /
+histogram() and updated from anywhere in the app. Values that are cheaper to
+read on demand (directory sizes, cache stats) are refreshed by collectors
+registered with register_collector(), which run right before each scrape.
+
+The registry is per process: with several uvicorn workers each one serves its
+own numbers, so scrape every worker or run a single worker per container.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., sum, count]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            if idx < len(self.buckets):
+                series[idx] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return series[-1] if series else 0.0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        names = self.labelnames + ("le",)
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} "
+                    f"{_format_value(cumulative)}"
+                )
+            lines.append(
+                f"{self.name}_bucket{_format_labels(names, key + ('+Inf',))} {_format_value(series[-1])}"
+            )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+
+_registry: dict[str, _Metric] = {}
+_collectors: list[Callable[[], None]] = []
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(cls, name: str, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as {metric.kind}")
+        return metric
+
+
+def counter(name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+    return _get_or_create(Counter, name, help_text, labelnames)
+
+
+def gauge(name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+    return _get_or_create(Gauge, name, help_text, labelnames)
+
+
+def histogram(
+    name: str,
+    help_text: str,
+    labelnames: tuple[str, ...] = (),
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return _get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+
+def register_collector(fn: Callable[[], None]) -> Callable[[], None]:
+    """Register a callback that refreshes gauges right before each scrape."""
+    _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    """Run the collectors and return every metric in Prometheus text format."""
+    for collect in list(_collectors):
+        try:
+            collect()
+        except Exception:
+            # A broken collector must never take the whole endpoint down
+            COLLECTOR_ERRORS.inc(collector=getattr(collect, "__name__", "unknown"))
+
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    lines: list[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+COLLECTOR_ERRORS = counter(
+    "egolf_metrics_collector_errors_total",
+    "Collector callbacks that raised during a scrape",
+    ("collector",),
+)
+
+HTTP_REQUESTS = counter(
+    "egolf_http_requests_total",
+    "HTTP requests served, by route template and status code",
+    ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = gauge(
+    "egolf_http_requests_in_flight",
+    "HTTP requests currently being served",
+)
+HTTP_LATENCY = histogram(
+    "egolf_http_request_duration_seconds",
+    "HTTP request latency, by route template and status code",
+    ("method", "route", "status"),
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+OTHER_METHOD = "OTHER"
+HTTP_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "DELETE", "CONNECT", "OPTIONS", "TRACE", "PATCH"))
+
+
+def route_template(scope) -> str:
+    """Return the full route template matched for this request."""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    # Depending on the FastAPI version, routes from an included router report
+    # their path relative to the router prefix. Parameters match exactly one
+    # segment, so the prefix is the concrete path minus the template's segments.
+    segments = template.count("/")
+    prefix = scope["path"].rsplit("/", segments)[0] if segments else scope["path"]
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request count, in-flight requests and latency.
+
+    Requests are labelled with the route template ("/api/holes/{hole_id}")
+    rather than the raw path, and any method outside HTTP_METHODS as "OTHER",
+    so label cardinality stays bounded by the number of routes no matter what
+    clients send.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            labels = {
+                "method": scope["method"] if scope["method"] in HTTP_METHODS else OTHER_METHOD,
+                "route": route_template(scope),
+                "status": str(status_code),
+            }
+            HTTP_REQUESTS.inc(**labels)
+            HTTP_LATENCY.observe(time.perf_counter() - start, **labels)
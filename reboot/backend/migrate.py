@@ -6,15 +6,46 @@ Usage:
     python migrate.py --up         # Apply the next pending migration only
     python migrate.py --down       # Rollback the last applied migration
     python migrate.py --status     # Show migration status
+    python migrate.py --schema     # Apply pending SQL migrations only (as start-up does)
+    python migrate.py --data       # Apply pending data migrations only
+
+Migrations are either SQL files (NNN_name.sql, run with executescript) or
+Python data migrations (NNN_name.py) that rewrite rows of a large table in
+small id-ranged chunks. A data migration module defines:
+
+    TABLE = "holes"                    # table with an INTEGER PRIMARY KEY id
+    CHUNK_SIZE = 500                   # optional, rows per chunk
+    THROTTLE_SECONDS = 0.05            # optional, pause between chunks
+
+    def migrate_chunk(conn, first_id, last_id):
+        ...                            # process rows with first_id <= id <= last_id
+
+    def down(conn):                    # optional rollback
+        ...
+
+Each chunk commits on its own, together with its progress in _migrations, so
+the live app only ever waits for one chunk, and an interrupted run resumes
+after the last committed chunk. Rows inserted after the run started are not
+visited; new rows are expected to be handled by the app itself.
+
+Data migrations only run from this script: app start-up applies the SQL
+migrations and records pending data migrations as 'deferred' in _migrations
+(see run_all). They never change the schema, so PRAGMA user_version only
+tracks SQL migrations.
 """
 
+import importlib.util
 import os
 import sys
 import sqlite3
+import time
 from db import get_connection
 
 MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
 
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_THROTTLE_SECONDS = float(os.environ.get("MIGRATION_THROTTLE_SECONDS", "0.05"))
+
 
 def ensure_migrations_table(conn: sqlite3.Connection) -> None:
     conn.execute("""
@@ -24,12 +55,20 @@ def ensure_migrations_table(conn: sqlite3.Connection) -> None:
             applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    # Progress tracking for chunked data migrations (added after 001)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(_migrations)")}
+    if "status" not in columns:
+        conn.execute("ALTER TABLE _migrations ADD COLUMN status TEXT NOT NULL DEFAULT 'applied'")
+    if "last_id" not in columns:
+        conn.execute("ALTER TABLE _migrations ADD COLUMN last_id INTEGER")
     conn.commit()
 
 
 def get_applied_migrations(conn: sqlite3.Connection) -> list[str]:
     """Return applied migration filenames in sorted order."""
-    rows = conn.execute("SELECT filename FROM _migrations ORDER BY filename").fetchall()
+    rows = conn.execute(
+        "SELECT filename FROM _migrations WHERE status = 'applied' ORDER BY filename"
+    ).fetchall()
     return [row["filename"] for row in rows]
 
 
@@ -37,16 +76,141 @@ def get_all_migration_files() -> list[str]:
     """Return all up-migration filenames sorted."""
     return sorted(
         f for f in os.listdir(MIGRATIONS_DIR)
-        if f.endswith(".sql") and not f.endswith(".down.sql")
+        if (f.endswith(".sql") and not f.endswith(".down.sql"))
+        or (f.endswith(".py") and f[:1].isdigit())
     )
 
 
+def is_data_migration(filename: str) -> bool:
+    return filename.endswith(".py")
+
+
+def get_schema_migration_files() -> list[str]:
+    return [f for f in get_all_migration_files() if not is_data_migration(f)]
+
+
 def get_pending_migrations(conn: sqlite3.Connection) -> list[str]:
     applied = set(get_applied_migrations(conn))
     return [f for f in get_all_migration_files() if f not in applied]
 
 
+def migration_number(filename: str) -> int:
+    """Numeric prefix of a migration file (e.g. 2 for 002_list_indexes.sql)."""
+    return int(filename.split("_", 1)[0])
+
+
+def latest_schema_version() -> int:
+    files = get_schema_migration_files()
+    return migration_number(files[-1]) if files else 0
+
+
+def record_schema_version(conn: sqlite3.Connection) -> None:
+    """
+    Store the schema version in PRAGMA user_version.
+
+    It is set to the newest SQL migration's number once every SQL migration is
+    applied, so a matching user_version lets start-up skip the migration scan
+    entirely. Pending data migrations don't count: start-up defers them.
+    """
+    applied = set(get_applied_migrations(conn))
+    current = all(f in applied for f in get_schema_migration_files())
+    version = latest_schema_version() if current else 0
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+    conn.commit()
+
+
+def schema_is_current(conn: sqlite3.Connection) -> bool:
+    """Cheap check (one PRAGMA plus a directory listing) used on start-up."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    return version != 0 and version == latest_schema_version()
+
+
+def _load_data_migration(filename: str):
+    filepath = os.path.join(MIGRATIONS_DIR, filename)
+    spec = importlib.util.spec_from_file_location(f"_migration_{filename[:-3]}", filepath)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def apply_data_migration(conn: sqlite3.Connection, filename: str) -> None:
+    module = _load_data_migration(filename)
+    table = module.TABLE
+    chunk_size = getattr(module, "CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    throttle = getattr(module, "THROTTLE_SECONDS", DEFAULT_THROTTLE_SECONDS)
+
+    conn.execute(
+        "INSERT OR IGNORE INTO _migrations (filename, status, last_id) VALUES (?, 'running', 0)",
+        (filename,),
+    )
+    conn.execute(
+        "UPDATE _migrations SET status = 'running' WHERE filename = ? AND status = 'deferred'",
+        (filename,),
+    )
+    conn.commit()
+    last_id = conn.execute(
+        "SELECT last_id FROM _migrations WHERE filename = ?", (filename,)
+    ).fetchone()["last_id"] or 0
+
+    # Snapshot the range up front so a busy table cannot keep the run going forever
+    max_id = conn.execute(f"SELECT MAX(id) AS max_id FROM {table}").fetchone()["max_id"] or 0
+    remaining = conn.execute(
+        f"SELECT COUNT(*) AS cnt FROM {table} WHERE id > ? AND id <= ?", (last_id, max_id)
+    ).fetchone()["cnt"]
+
+    if last_id:
+        print(f"  Resuming {filename} after id {last_id} ({remaining} rows left)...")
+    else:
+        print(f"  Applying {filename} ({remaining} rows of {table})...")
+
+    done = 0
+    started = time.perf_counter()
+    while last_id < max_id:
+        chunk_started = time.perf_counter()
+        ids = conn.execute(
+            f"SELECT id FROM {table} WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+            (last_id, max_id, chunk_size),
+        ).fetchall()
+        if not ids:
+            break
+        first_id, end_id = ids[0]["id"], ids[-1]["id"]
+
+        try:
+            module.migrate_chunk(conn, first_id, end_id)
+            conn.execute(
+                "UPDATE _migrations SET last_id = ? WHERE filename = ?",
+                (end_id, filename),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        last_id = end_id
+        done += len(ids)
+        chunk_seconds = time.perf_counter() - chunk_started
+        rate = done / (time.perf_counter() - started)
+        eta = (remaining - done) / rate if rate > 0 else 0.0
+        print(
+            f"    ids {first_id}-{end_id}: {len(ids)} rows in {chunk_seconds * 1000:.0f} ms "
+            f"({done}/{remaining}, {rate:.0f} rows/s, ~{eta:.0f}s left)"
+        )
+        if throttle > 0 and last_id < max_id:
+            time.sleep(throttle)
+
+    conn.execute(
+        "UPDATE _migrations SET status = 'applied', applied_at = CURRENT_TIMESTAMP WHERE filename = ?",
+        (filename,),
+    )
+    conn.commit()
+    print(f"  Done ({done} rows in {time.perf_counter() - started:.1f}s).")
+
+
 def apply_migration(conn: sqlite3.Connection, filename: str) -> None:
+    if is_data_migration(filename):
+        apply_data_migration(conn, filename)
+        return
+
     filepath = os.path.join(MIGRATIONS_DIR, filename)
     with open(filepath, "r") as f:
         sql = f.read()
@@ -62,6 +226,18 @@ def apply_migration(conn: sqlite3.Connection, filename: str) -> None:
 
 
 def rollback_migration(conn: sqlite3.Connection, filename: str) -> None:
+    if is_data_migration(filename):
+        module = _load_data_migration(filename)
+        print(f"  Rolling back {filename}...")
+        if hasattr(module, "down"):
+            module.down(conn)
+        else:
+            print("  (data migration without down(); only its record is removed)")
+        conn.execute("DELETE FROM _migrations WHERE filename = ?", (filename,))
+        conn.commit()
+        print(f"  Done.")
+        return
+
     # Look for a corresponding .down.sql file
     down_filename = filename.replace(".sql", ".down.sql")
     down_filepath = os.path.join(MIGRATIONS_DIR, down_filename)
@@ -81,22 +257,70 @@ def rollback_migration(conn: sqlite3.Connection, filename: str) -> None:
     print(f"  Done.")
 
 
-def run_all() -> None:
-    """Apply all pending migrations."""
+def defer_data_migrations(conn: sqlite3.Connection, filenames: list[str]) -> None:
+    """Record data migrations left for `python migrate.py --data`."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO _migrations (filename, status, last_id) VALUES (?, 'deferred', 0)",
+        [(f,) for f in filenames],
+    )
+    conn.commit()
+
+
+def run_all(quick: bool = False) -> None:
+    """Apply all pending migrations.
+
+    With quick=True (used on app start-up) nothing else is done when
+    PRAGMA user_version already matches the newest SQL migration, and only SQL
+    migrations are applied: chunked data migrations are slow and would run in
+    every worker at once, so they are recorded as deferred and left for
+    `python migrate.py --data`.
+    """
     conn = get_connection()
     try:
+        if quick and schema_is_current(conn):
+            return
+
         ensure_migrations_table(conn)
         pending = get_pending_migrations(conn)
+        deferred = [f for f in pending if is_data_migration(f)] if quick else []
+        pending = [f for f in pending if f not in deferred]
 
         if not pending:
-            print("No pending migrations.")
-            return
+            if not deferred:
+                print("No pending migrations.")
+        else:
+            print(f"Found {len(pending)} pending migration(s):")
+            for filename in pending:
+                apply_migration(conn, filename)
+            print("All migrations applied successfully.")
+        record_schema_version(conn)
+
+        if deferred:
+            defer_data_migrations(conn, deferred)
+            print(
+                f"{len(deferred)} data migration(s) deferred ({', '.join(deferred)}); "
+                "run `python migrate.py --data` to apply them."
+            )
+    finally:
+        conn.close()
 
-        print(f"Found {len(pending)} pending migration(s):")
-        for filename in pending:
-            apply_migration(conn, filename)
 
-        print("All migrations applied successfully.")
+def run_data() -> None:
+    """Apply pending data migrations only (SQL migrations must be applied first)."""
+    conn = get_connection()
+    try:
+        ensure_migrations_table(conn)
+        if not schema_is_current(conn):
+            print("SQL migrations are pending; run `python migrate.py --schema` first.")
+            sys.exit(1)
+        pending = [f for f in get_pending_migrations(conn) if is_data_migration(f)]
+        if not pending:
+            print("No pending data migrations.")
+            return
+        print(f"Found {len(pending)} pending data migration(s):")
+        for filename in pending:
+            apply_data_migration(conn, filename)
+        print("All data migrations applied successfully.")
     finally:
         conn.close()
 
@@ -113,6 +337,7 @@ def run_up() -> None:
             return
 
         apply_migration(conn, pending[0])
+        record_schema_version(conn)
     finally:
         conn.close()
 
@@ -130,6 +355,7 @@ def run_down() -> None:
 
         last = applied[-1]
         rollback_migration(conn, last)
+        record_schema_version(conn)
     finally:
         conn.close()
 
@@ -142,9 +368,23 @@ def show_status() -> None:
         all_files = get_all_migration_files()
 
         print("Migration status:")
+        running = {
+            row["filename"]: row["last_id"]
+            for row in conn.execute("SELECT filename, last_id FROM _migrations WHERE status = 'running'")
+        }
+        deferred = {
+            row["filename"]
+            for row in conn.execute("SELECT filename FROM _migrations WHERE status = 'deferred'")
+        }
         for f in all_files:
-            status = "APPLIED" if f in applied else "PENDING"
-            print(f"  [{status}] {f}")
+            if f in applied:
+                print(f"  [APPLIED] {f}")
+            elif f in deferred:
+                print(f"  [DEFERRED] {f} (run `python migrate.py --data`)")
+            elif f in running:
+                print(f"  [PARTIAL] {f} (resumes after id {running[f]})")
+            else:
+                print(f"  [PENDING] {f}")
 
         if not all_files:
             print("  No migration files found.")
@@ -159,5 +399,9 @@ if __name__ == "__main__":
         run_up()
     elif "--down" in sys.argv:
         run_down()
+    elif "--schema" in sys.argv:
+        run_all(quick=True)
+    elif "--data" in sys.argv:
+        run_data()
     else:
         run_all()
@@ -0,0 +1,8 @@
+-- 002_list_indexes.down.sql
+-- Rollback: drop the indexes created in 002_list_indexes.sql
+
+DROP INDEX IF EXISTS idx_holes_created_at;
+DROP INDEX IF EXISTS idx_hole_plays_hole;
+DROP INDEX IF EXISTS idx_hole_plays_user;
+DROP INDEX IF EXISTS idx_hole_plays_created_at;
+DROP INDEX IF EXISTS idx_hole_play_moves_play;
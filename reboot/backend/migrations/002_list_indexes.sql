@@ -0,0 +1,8 @@
+-- 002_list_indexes.sql
+-- Indexes backing the list endpoints and per-play move lookups
+
+CREATE INDEX IF NOT EXISTS idx_hole_play_moves_play ON hole_play_moves(hole_play_id, move_order);
+CREATE INDEX IF NOT EXISTS idx_hole_plays_created_at ON hole_plays(created_at);
+CREATE INDEX IF NOT EXISTS idx_hole_plays_user ON hole_plays(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_hole_plays_hole ON hole_plays(hole_id, strokes);
+CREATE INDEX IF NOT EXISTS idx_holes_created_at ON holes(created_at);
@@ -0,0 +1,4 @@
+-- 003_hole_features.down.sql
+-- Rollback: drop the hole_features table and its indexes
+
+DROP TABLE IF EXISTS hole_features;
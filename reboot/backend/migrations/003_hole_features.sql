@@ -0,0 +1,24 @@
+-- 003_hole_features.sql
+-- Terrain features per hole, computed once so holes can be searched and
+-- sorted by composition without regenerating their terrain
+
+CREATE TABLE IF NOT EXISTS hole_features (
+    hole_id INTEGER PRIMARY KEY REFERENCES holes(id) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    grass_fraction REAL NOT NULL,
+    fairway_fraction REAL NOT NULL,
+    sand_fraction REAL NOT NULL,
+    tree_fraction REAL NOT NULL,
+    water_fraction REAL NOT NULL,
+    distance REAL NOT NULL,
+    par INTEGER NOT NULL,
+    obstacle_density REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_hole_features_fairway ON hole_features(fairway_fraction);
+CREATE INDEX IF NOT EXISTS idx_hole_features_sand ON hole_features(sand_fraction);
+CREATE INDEX IF NOT EXISTS idx_hole_features_tree ON hole_features(tree_fraction);
+CREATE INDEX IF NOT EXISTS idx_hole_features_water ON hole_features(water_fraction);
+CREATE INDEX IF NOT EXISTS idx_hole_features_distance ON hole_features(distance);
+CREATE INDEX IF NOT EXISTS idx_hole_features_par ON hole_features(par, distance);
+CREATE INDEX IF NOT EXISTS idx_hole_features_obstacles ON hole_features(obstacle_density);
@@ -0,0 +1,37 @@
+"""
+004_backfill_hole_features.py
+Compute terrain features for holes created before hole_features existed
+(and recompute rows from an older FEATURES_VERSION).
+"""
+
+from hole_features import feature_values, save_hole_features
+from terrain import FEATURES_VERSION, generate_full_terrain
+
+TABLE = "holes"
+# Each terrain takes up to ~100 ms to generate; small chunks keep progress
+# (and resuming) fine-grained
+CHUNK_SIZE = 25
+
+
+def migrate_chunk(conn, first_id, last_id):
+    rows = conn.execute(
+        """
+        SELECT h.id, h.seed, h.width, h.height
+        FROM holes h
+        LEFT JOIN hole_features f ON f.hole_id = h.id
+        WHERE h.id BETWEEN ? AND ? AND (f.hole_id IS NULL OR f.version < ?)
+        """,
+        (first_id, last_id, FEATURES_VERSION),
+    ).fetchall()
+    # Generate everything before the first write: the SELECT above does not
+    # open a write transaction, so the lock is only held for the inserts
+    features = [
+        (r["id"], feature_values(generate_full_terrain(r["seed"], r["width"], r["height"])))
+        for r in rows
+    ]
+    save_hole_features(conn, features)
+
+
+def down(conn):
+    # The table itself belongs to 003; nothing to undo beyond its contents
+    conn.execute("DELETE FROM hole_features")
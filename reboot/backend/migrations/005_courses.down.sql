@@ -0,0 +1,5 @@
+-- 005_courses.down.sql
+-- Rollback: drop the course tables created in 005_courses.sql
+
+DROP TABLE IF EXISTS course_holes;
+DROP TABLE IF EXISTS courses;
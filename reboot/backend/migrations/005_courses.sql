@@ -0,0 +1,21 @@
+-- 005_courses.sql
+-- Courses: ordered lists of holes (the legacy Course model)
+
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    author_id INTEGER REFERENCES users(id),
+    revision INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS course_holes (
+    course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    hole_id INTEGER NOT NULL REFERENCES holes(id),
+    PRIMARY KEY (course_id, position)
+);
+
+CREATE INDEX IF NOT EXISTS idx_course_holes_hole ON course_holes(hole_id);
+CREATE INDEX IF NOT EXISTS idx_courses_created_at ON courses(created_at);
@@ -0,0 +1,106 @@
+"""
+Pre-warm the terrain thumbnail cache across all cores.
+
+Usage:
+    python prewarm.py                          # Every hole in the database
+    python prewarm.py --seeds seeds.txt        # Seed list: "seed width height" per line
+    python prewarm.py - < seeds.txt            # Seed list from stdin
+    python prewarm.py --workers 4              # Default: one per CPU
+
+Renders the PNG of every (seed, width, height) that is not in terrain_cache/
+yet, so the first visitors after a deploy or a cache wipe don't pay for
+generation and rendering. Thumbnails are written atomically (temp file, then
+rename), so this is safe to run while the API is serving traffic.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable
+
+from db import get_connection
+from routes.terrain import save_terrain_thumbnail, thumbnail_path
+
+
+def holes_from_db() -> list[tuple[str, int, int]]:
+    conn = get_connection()
+    try:
+        rows = conn.execute("SELECT seed, width, height FROM holes ORDER BY id").fetchall()
+    finally:
+        conn.close()
+    return [(r["seed"], r["width"], r["height"]) for r in rows]
+
+
+def holes_from_lines(lines: Iterable[str]) -> list[tuple[str, int, int]]:
+    keys = []
+    for line_no, line in enumerate(lines, 1):
+        parts = line.replace(",", " ").split()
+        if not parts or parts[0].startswith("#"):
+            continue
+        try:
+            seed, width, height = parts[0], int(parts[1]), int(parts[2])
+        except (IndexError, ValueError):
+            raise SystemExit(f"line {line_no}: expected 'seed width height', got {line.strip()!r}")
+        if len(seed) != 8 or not (5 <= width <= 100) or not (5 <= height <= 100):
+            raise SystemExit(f"line {line_no}: seed or dimensions out of range")
+        keys.append((seed, width, height))
+    return keys
+
+
+def _render(key: tuple[str, int, int]) -> int:
+    """Worker: render one thumbnail, return its size in bytes."""
+    return save_terrain_thumbnail(*key).stat().st_size
+
+
+def main(argv: list[str]) -> None:
+    if argv and argv[0] in ("-h", "--help"):
+        print(__doc__)
+        sys.exit(0)
+
+    workers = os.cpu_count() or 1
+    if "--workers" in argv:
+        workers = int(argv[argv.index("--workers") + 1])
+
+    if "--seeds" in argv:
+        with open(argv[argv.index("--seeds") + 1], "r", encoding="utf-8") as f:
+            keys = holes_from_lines(f)
+    elif argv and argv[0] == "-":
+        keys = holes_from_lines(sys.stdin)
+    else:
+        keys = holes_from_db()
+
+    keys = list(dict.fromkeys(keys))
+    missing = [k for k in keys if not thumbnail_path(*k).exists()]
+    print(f"{len(keys)} terrains, {len(keys) - len(missing)} already cached, {len(missing)} to render "
+          f"with {workers} worker(s)")
+    if not missing:
+        return
+
+    started = time.perf_counter()
+    done = failed = total_bytes = 0
+    report_every = max(1, len(missing) // 20)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_render, key): key for key in missing}
+        for future in as_completed(futures):
+            try:
+                total_bytes += future.result()
+            except Exception as e:
+                failed += 1
+                print(f"  FAILED {futures[future]}: {e}")
+            done += 1
+            if done % report_every == 0 or done == len(missing):
+                elapsed = time.perf_counter() - started
+                print(f"  {done}/{len(missing)} ({done / elapsed:.1f}/s)")
+
+    elapsed = time.perf_counter() - started
+    print(f"Done: {done - failed} rendered, {failed} failed, {total_bytes / 1024:.0f} KiB "
+          f"in {elapsed:.1f}s ({done / elapsed:.1f}/s)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
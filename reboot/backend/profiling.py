@@ -0,0 +1,219 @@
+"""
+Opt-in per-request profiling with cProfile.
+
+Nothing happens unless PROFILE_ENABLED is set. A request is then profiled when
+either:
+  - it sends an `X-Profile` header equal to PROFILE_TOKEN, or
+  - it is picked by 1-in-N sampling (PROFILE_SAMPLE_RATE=N, 0 disables it).
+
+The request's route handler (body parsing, dependencies, validation, the
+endpoint and response serialization) runs under cProfile, and the stats are
+written to PROFILE_DIR as a `.pstats` file (open with `python -m pstats` or snakeviz). The file name is
+returned in the `X-Profile-File` response header.
+
+Overhead is capped: at most one request is profiled at a time (others run
+normally), and only the newest PROFILE_MAX_FILES files are kept on disk.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import functools
+import hmac
+import inspect
+import itertools
+import os
+import pstats
+import re
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+import metrics
+
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "false").lower() in ("true", "1", "yes")
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = int(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "50"))
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", os.path.join(os.path.dirname(__file__), "profiles")))
+
+PROFILE_HEADER = b"x-profile"
+
+PROFILED_REQUESTS = metrics.counter(
+    "egolf_profiled_requests_total",
+    "Requests run under the profiler, by trigger",
+    ("trigger",),
+)
+PROFILES_SKIPPED = metrics.counter(
+    "egolf_profiles_skipped_total",
+    "Requests selected for profiling but skipped because another profile was running",
+)
+
+# Only one request is profiled at a time: bounds the overhead, and on
+# Python 3.12+ cProfile cannot run twice concurrently anyway.
+_slot = threading.Lock()
+_sample_counter = itertools.count(1)
+_current: ContextVar[Optional["_ProfileSession"]] = ContextVar("profile_session", default=None)
+
+
+class _ProfileSession:
+    """The profiles of one request: one per thread it ran code in."""
+
+    def __init__(self):
+        self.filename = ""
+        self.profiles: list[cProfile.Profile] = []
+
+    def run(self, fn, *args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (debugger, coverage...) already owns the hook;
+            # on Python 3.12+ that includes this request's own handler
+            # profile, which then sees every thread anyway
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            self.profiles.append(profile)
+
+    async def run_async(self, fn, *args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return await fn(*args, **kwargs)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            self.profiles.append(profile)
+
+
+def _trigger(scope) -> Optional[str]:
+    """Return why this request should be profiled, or None."""
+    if PROFILE_TOKEN:
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER:
+                if hmac.compare_digest(value, PROFILE_TOKEN.encode("utf-8")):
+                    return "header"
+                break
+    if PROFILE_SAMPLE_RATE > 0 and next(_sample_counter) % PROFILE_SAMPLE_RATE == 0:
+        return "sample"
+    return None
+
+
+def _profile_filename(scope) -> str:
+    route = re.sub(r"[^A-Za-z0-9]+", "_", metrics.route_template(scope)).strip("_") or "root"
+    now = time.time()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    return f"{stamp}.{int(now * 1000) % 1000:03d}_{scope['method']}_{route}.pstats"
+
+
+def _write_profile(session: _ProfileSession) -> None:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stats = pstats.Stats(*session.profiles)
+    stats.dump_stats(PROFILE_DIR / session.filename)
+
+    # Keep only the newest PROFILE_MAX_FILES profiles
+    files = sorted(PROFILE_DIR.glob("*.pstats"), key=lambda p: p.stat().st_mtime)
+    for old in files[: max(len(files) - PROFILE_MAX_FILES, 0)]:
+        old.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that selects requests for profiling and saves the stats."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not PROFILE_ENABLED or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trigger = _trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+        if not _slot.acquire(blocking=False):
+            PROFILES_SKIPPED.inc()
+            await self.app(scope, receive, send)
+            return
+
+        session = _ProfileSession()
+        token = _current.set(session)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and session.profiles:
+                # The route is known (and the endpoint has run) by now
+                session.filename = _profile_filename(scope)
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-file", session.filename.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            try:
+                if session.profiles:
+                    if not session.filename:
+                        session.filename = _profile_filename(scope)
+                    PROFILED_REQUESTS.inc(trigger=trigger)
+                    await run_in_threadpool(_write_profile, session)
+            finally:
+                _slot.release()
+
+
+def _profiled(call):
+    """Wrap a sync endpoint so its threadpool thread is profiled too when its request was selected."""
+    if getattr(call, "_egolf_profiled", False):
+        return call
+
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        # Sync endpoints run in the threadpool; the context var is copied there
+        session = _current.get()
+        if session is None:
+            return call(*args, **kwargs)
+        return session.run(call, *args, **kwargs)
+
+    wrapper._egolf_profiled = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute that can run its request handler under cProfile.
+
+    The handler runs on the event loop, but a sync endpoint runs in a
+    threadpool worker, which a profiler enabled on the loop's thread does not
+    see (before Python 3.12) — so sync endpoints get a profile of their own,
+    merged into the same file.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if PROFILE_ENABLED and not inspect.iscoroutinefunction(endpoint):
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if not PROFILE_ENABLED:
+            return handler
+
+        async def profiled_handler(request):
+            session = _current.get()
+            if session is None:
+                return await handler(request)
+            return await session.run_async(handler, request)
+
+        return profiled_handler
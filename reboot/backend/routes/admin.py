@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, Query, Request
+from starlette.concurrency import run_in_threadpool
+
+from auth import require_admin
+from bulk_import import BulkImporter, DEFAULT_BATCH_SIZE, open_import_connection
+from db import CONNECTIONS_IN_USE
+from profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+@router.post("/import")
+async def bulk_import(
+    request: Request,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=100, le=100_000),
+    user: dict = Depends(require_admin),
+):
+    """
+    Import holes and hole plays from an NDJSON request body (see bulk_import.py).
+
+    The body is read as a stream and handed to the importer one batch of lines
+    at a time, so memory use does not grow with the upload size.
+    """
+    conn = open_import_connection(check_same_thread=False)
+    CONNECTIONS_IN_USE.inc()
+    try:
+        importer = await run_in_threadpool(BulkImporter, conn, batch_size)
+        # Pieces of the line still being received; joined once it ends, so a
+        # long line spread over many chunks is not copied again on each one
+        partial: list[bytes] = []
+        lines: list[bytes] = []
+        async for chunk in request.stream():
+            *complete, rest = chunk.split(b"\n")
+            if complete:
+                complete[0] = b"".join(partial) + complete[0]
+                partial = []
+                lines.extend(complete)
+            partial.append(rest)
+            if len(lines) >= batch_size:
+                await run_in_threadpool(importer.add_lines, lines)
+                lines = []
+        lines.append(b"".join(partial))
+        await run_in_threadpool(importer.add_lines, lines)
+        await run_in_threadpool(importer.flush)
+    finally:
+        conn.close()
+        CONNECTIONS_IN_USE.dec()
+
+    return importer.summary()
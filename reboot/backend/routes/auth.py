@@ -1,73 +1,96 @@
 import os
 
 from fastapi import APIRouter, HTTPException, Depends, status
+from starlette.concurrency import run_in_threadpool
 from schemas import SignupRequest, LoginRequest, UserResponse, TokenResponse
 from auth import hash_password, verify_password, create_access_token, require_user
 from db import get_db
+from profiling import ProfiledRoute
 
 REGISTRATION_ENABLED = os.environ.get("REGISTRATION_ENABLED", "true").lower() in ("true", "1", "yes")
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
-@router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def signup(req: SignupRequest):
-    if not REGISTRATION_ENABLED:
+def _check_available(conn, req: SignupRequest) -> None:
+    # Check if username already exists
+    existing = conn.execute(
+        "SELECT id FROM users WHERE username = ?", (req.username,)
+    ).fetchone()
+    if existing:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Registration is currently disabled",
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Username already taken",
         )
+
+    # Check if email already exists
+    existing = conn.execute(
+        "SELECT id FROM users WHERE email = ?", (req.email,)
+    ).fetchone()
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Email already registered",
+        )
+
+
+def _precheck_signup(req: SignupRequest) -> None:
     with get_db() as conn:
-        # Check if username already exists
-        existing = conn.execute(
-            "SELECT id FROM users WHERE username = ?", (req.username,)
-        ).fetchone()
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Username already taken",
-            )
-
-        # Check if email already exists
-        existing = conn.execute(
-            "SELECT id FROM users WHERE email = ?", (req.email,)
-        ).fetchone()
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Email already registered",
-            )
+        _check_available(conn, req)
+
 
-        password_hash = hash_password(req.password)
+def _create_user(req: SignupRequest, password_hash: str):
+    with get_db() as conn:
+        # Checked again: another signup may have taken the name while hashing
+        _check_available(conn, req)
         cursor = conn.execute(
             "INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
             (req.username, req.email, password_hash),
         )
-        user_id = cursor.lastrowid
-
-        user = conn.execute(
+        return conn.execute(
             "SELECT id, username, email, created_at FROM users WHERE id = ?",
-            (user_id,),
+            (cursor.lastrowid,),
         ).fetchone()
 
-    return UserResponse(**dict(user))
-
 
-@router.post("/login", response_model=TokenResponse)
-def login(req: LoginRequest):
+def _fetch_login_user(username: str):
     with get_db() as conn:
-        user = conn.execute(
+        return conn.execute(
             "SELECT id, username, email, password_hash FROM users WHERE username = ?",
-            (req.username,),
+            (username,),
         ).fetchone()
 
+
+# signup and login are async so that waiting for bcrypt (on the hashing
+# process pool) holds no threadpool thread; their quick queries still run
+# in the threadpool.
+
+@router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def signup(req: SignupRequest):
+    if not REGISTRATION_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Registration is currently disabled",
+        )
+    # Reject taken names before spending a hash on them
+    await run_in_threadpool(_precheck_signup, req)
+    password_hash = await hash_password(req.password)
+    user = await run_in_threadpool(_create_user, req, password_hash)
+
+    return UserResponse(**dict(user))
+
+
+@router.post("/login", response_model=TokenResponse)
+async def login(req: LoginRequest):
+    user = await run_in_threadpool(_fetch_login_user, req.username)
+
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
         )
 
-    if not verify_password(req.password, user["password_hash"]):
+    if not await verify_password(req.password, user["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
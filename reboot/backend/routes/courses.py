@@ -0,0 +1,197 @@
+import math
+import os
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
+from schemas import (
+    CourseCreateRequest,
+    CourseListResponse,
+    CourseResponse,
+    CourseUpdateRequest,
+)
+from auth import require_user
+import http_cache
+from cache import TTLCache
+from db import get_db
+from fast_json import RawJSONResponse, dumps
+from profiling import ProfiledRoute
+from routes.holes import HOLE_QUERY, row_to_hole_dict
+from routes.terrain import TERRAIN_VERSION, get_terrains
+
+router = APIRouter(route_class=ProfiledRoute)
+
+COURSE_BUNDLE_CACHE_SIZE = int(os.environ.get("COURSE_BUNDLE_CACHE_SIZE", "64"))
+
+# (course id, revision) -> EncodedBody of the bundle. Every change bumps the
+# course's revision, so stale bundles are never served, by any worker.
+_bundles = TTLCache("course_bundles", maxsize=COURSE_BUNDLE_CACHE_SIZE, ttl=24 * 3600)
+
+COURSE_QUERY = """
+    SELECT c.id, c.name, c.author_id, c.revision, c.created_at, c.updated_at,
+           u.username AS author_name,
+           (SELECT COUNT(*) FROM course_holes ch WHERE ch.course_id = c.id) AS hole_count
+    FROM courses c
+    LEFT JOIN users u ON c.author_id = u.id
+"""
+
+
+def _course_row_to_dict(row, holes: list[dict]) -> dict:
+    """Shape a COURSE_QUERY row exactly like CourseResponse."""
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "author_id": row["author_id"],
+        "author_name": row["author_name"],
+        "revision": row["revision"],
+        "hole_count": row["hole_count"],
+        "created_at": str(row["created_at"]),
+        "updated_at": str(row["updated_at"]),
+        "holes": holes,
+    }
+
+
+def _fetch_course(conn, course_id: int):
+    row = conn.execute(f"{COURSE_QUERY} WHERE c.id = ?", (course_id,)).fetchone()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+    return row
+
+
+def _fetch_course_holes(conn, course_id: int) -> list:
+    return conn.execute(
+        f"""
+        {HOLE_QUERY}
+        JOIN course_holes ch ON ch.hole_id = h.id
+        WHERE ch.course_id = ?
+        ORDER BY ch.position
+        """,
+        (course_id,),
+    ).fetchall()
+
+
+def _set_course_holes(conn, course_id: int, hole_ids: list[int]) -> None:
+    placeholders = ",".join("?" * len(hole_ids))
+    found = {
+        r["id"] for r in conn.execute(f"SELECT id FROM holes WHERE id IN ({placeholders})", hole_ids)
+    }
+    unknown = [hole_id for hole_id in hole_ids if hole_id not in found]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown hole ids: {unknown}",
+        )
+    conn.execute("DELETE FROM course_holes WHERE course_id = ?", (course_id,))
+    conn.executemany(
+        "INSERT INTO course_holes (course_id, position, hole_id) VALUES (?, ?, ?)",
+        [(course_id, i, hole_id) for i, hole_id in enumerate(hole_ids)],
+    )
+
+
+def _course_response(conn, course_id: int) -> dict:
+    row = _fetch_course(conn, course_id)
+    holes = [row_to_hole_dict(r) for r in _fetch_course_holes(conn, course_id)]
+    return _course_row_to_dict(row, holes)
+
+
+def bundle_etag(course_id: int, revision: int) -> str:
+    """ETag of a course bundle, known from the course row alone."""
+    return http_cache.make_etag(f"{TERRAIN_VERSION}:course:{course_id}:{revision}".encode("utf-8"))
+
+
+@router.get("", response_model=CourseListResponse)
+def list_courses(page: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100)):
+    offset = page * limit
+    with get_db() as conn:
+        rows = conn.execute(
+            f"""
+            {COURSE_QUERY}
+            ORDER BY c.created_at DESC
+            LIMIT ? OFFSET ?
+            """,
+            (limit, offset),
+        ).fetchall()
+
+        total = conn.execute("SELECT COUNT(*) AS cnt FROM courses").fetchone()["cnt"]
+
+    return RawJSONResponse(dumps({
+        "courses": [_course_row_to_dict(r, []) for r in rows],
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "pages": math.ceil(total / limit) if total > 0 else 0,
+    }))
+
+
+@router.get("/{course_id}", response_model=CourseResponse)
+def get_course(course_id: int):
+    with get_db() as conn:
+        return RawJSONResponse(dumps(_course_response(conn, course_id)))
+
+
+@router.get("/{course_id}/bundle")
+def get_course_bundle(course_id: int, request: Request):
+    """
+    Every hole of a course with its terrain, in one response.
+
+    Terrain is compact: `map` is a list of row strings ("ggfs..."), one per
+    row, instead of a list of single-tile lists.
+    """
+    with get_db() as conn:
+        row = _fetch_course(conn, course_id)
+        etag = bundle_etag(course_id, row["revision"])
+        if http_cache.is_not_modified(request, etag):
+            return http_cache.not_modified_response(etag, http_cache.REVALIDATE)
+
+        key = (course_id, row["revision"])
+        entry = _bundles.get(key)
+        if entry is not None:
+            return http_cache.respond(request, entry, http_cache.REVALIDATE)
+        hole_rows = _fetch_course_holes(conn, course_id)
+
+    terrains = get_terrains([(h["seed"], h["width"], h["height"]) for h in hole_rows])
+    holes = []
+    for hole_row, data in zip(hole_rows, terrains):
+        hole = row_to_hole_dict(hole_row)
+        hole["terrain"] = {
+            "map": ["".join(r) for r in data["map"]],
+            "ball_position": data["ball_position"],
+            "hole_position": data["hole_position"],
+            "par": data["par"],
+        }
+        holes.append(hole)
+
+    entry = http_cache.EncodedBody(dumps(_course_row_to_dict(row, holes)), etag=etag)
+    _bundles.set(key, entry)
+    return http_cache.respond(request, entry, http_cache.REVALIDATE)
+
+
+@router.post("", response_model=CourseResponse, status_code=status.HTTP_201_CREATED)
+def create_course(req: CourseCreateRequest, user: dict = Depends(require_user)):
+    with get_db() as conn:
+        cursor = conn.execute(
+            "INSERT INTO courses (name, author_id) VALUES (?, ?)",
+            (req.name, user["id"]),
+        )
+        course_id = cursor.lastrowid
+        _set_course_holes(conn, course_id, req.hole_ids)
+        return RawJSONResponse(dumps(_course_response(conn, course_id)), status_code=status.HTTP_201_CREATED)
+
+
+@router.put("/{course_id}", response_model=CourseResponse)
+def update_course(course_id: int, req: CourseUpdateRequest, user: dict = Depends(require_user)):
+    """Rename a course and/or replace its holes. Only the author may edit it."""
+    with get_db() as conn:
+        row = _fetch_course(conn, course_id)
+        if row["author_id"] != user["id"]:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your course")
+
+        if req.name is not None:
+            conn.execute("UPDATE courses SET name = ? WHERE id = ?", (req.name, course_id))
+        if req.hole_ids is not None:
+            _set_course_holes(conn, course_id, req.hole_ids)
+        conn.execute(
+            "UPDATE courses SET revision = revision + 1, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (course_id,),
+        )
+        response = _course_response(conn, course_id)
+
+    _bundles.pop((course_id, row["revision"]))
+    return RawJSONResponse(dumps(response))
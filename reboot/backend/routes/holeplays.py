@@ -1,42 +1,92 @@
 import math
+from datetime import datetime
 from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.responses import StreamingResponse
 from schemas import (
     HolePlayCreateRequest,
     HolePlayResponse,
     HolePlayListResponse,
-    MoveResponse,
 )
 from auth import require_user
-from db import get_db
+from db import get_db, sqlite_timestamp
+from fast_json import RawJSONResponse, dumps
+from profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
-def _build_hole_play_response(conn, play_row) -> HolePlayResponse:
-    d = dict(play_row)
-    moves = conn.execute(
-        """
-        SELECT id, move_order, from_x, from_y, to_x, to_y
+MOVE_COLUMNS = "id, move_order, from_x, from_y, to_x, to_y"
+
+
+def _play_row_to_dict(row, moves: list[dict]) -> dict:
+    """Shape a PLAY_JOIN_QUERY row exactly like HolePlayResponse."""
+    return {
+        "id": row["id"],
+        "hole_id": row["hole_id"],
+        "user_id": row["user_id"],
+        "strokes": row["strokes"],
+        "created_at": str(row["created_at"]),
+        "user_name": row["user_name"],
+        "hole_name": row["hole_name"],
+        "hole_seed": row["hole_seed"],
+        "hole_width": row["hole_width"],
+        "hole_height": row["hole_height"],
+        "moves": moves,
+    }
+
+
+def _fetch_moves(conn, play_ids: list[int]) -> dict[int, list[dict]]:
+    """Load the moves of many plays in one query, grouped by play id."""
+    moves: dict[int, list[dict]] = {play_id: [] for play_id in play_ids}
+    if not play_ids:
+        return moves
+    placeholders = ",".join("?" * len(play_ids))
+    rows = conn.execute(
+        f"""
+        SELECT hole_play_id, {MOVE_COLUMNS}
         FROM hole_play_moves
-        WHERE hole_play_id = ?
-        ORDER BY move_order
+        WHERE hole_play_id IN ({placeholders})
+        ORDER BY hole_play_id, move_order
         """,
-        (d["id"],),
+        play_ids,
     ).fetchall()
+    for m in rows:
+        moves[m["hole_play_id"]].append({
+            "id": m["id"],
+            "move_order": m["move_order"],
+            "from_x": m["from_x"],
+            "from_y": m["from_y"],
+            "to_x": m["to_x"],
+            "to_y": m["to_y"],
+        })
+    return moves
 
-    return HolePlayResponse(
-        id=d["id"],
-        hole_id=d["hole_id"],
-        user_id=d["user_id"],
-        strokes=d["strokes"],
-        created_at=str(d["created_at"]),
-        user_name=d.get("user_name"),
-        hole_name=d.get("hole_name"),
-        hole_seed=d.get("hole_seed"),
-        hole_width=d.get("hole_width"),
-        hole_height=d.get("hole_height"),
-        moves=[MoveResponse(**dict(m)) for m in moves],
+
+def insert_hole_play(conn, hole_id: int, user_id: int, moves: list[tuple[int, int, int, int]]) -> int:
+    """Insert a play and its (from_x, from_y, to_x, to_y) moves; returns the play id."""
+    cursor = conn.execute(
+        "INSERT INTO hole_plays (hole_id, user_id, strokes) VALUES (?, ?, ?)",
+        (hole_id, user_id, len(moves)),
     )
+    play_id = cursor.lastrowid
+    conn.executemany(
+        """
+        INSERT INTO hole_play_moves (hole_play_id, move_order, from_x, from_y, to_x, to_y)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [(play_id, i, *move) for i, move in enumerate(moves)],
+    )
+    return play_id
+
+
+def _build_hole_play_response(conn, play_row) -> HolePlayResponse:
+    moves = _fetch_moves(conn, [play_row["id"]])[play_row["id"]]
+    return HolePlayResponse(**_play_row_to_dict(play_row, moves))
+
+
+def load_hole_play(conn, play_id: int) -> HolePlayResponse:
+    row = conn.execute(f"{PLAY_JOIN_QUERY} WHERE hp.id = ?", (play_id,)).fetchone()
+    return _build_hole_play_response(conn, row)
 
 
 PLAY_JOIN_QUERY = """
@@ -94,14 +144,83 @@ def list_hole_plays(
         count_query = f"SELECT COUNT(*) AS cnt FROM hole_plays hp {where_clause}"
         total = conn.execute(count_query, params).fetchone()["cnt"]
 
-        plays = [_build_hole_play_response(conn, r) for r in rows]
+        moves = _fetch_moves(conn, [r["id"] for r in rows])
+        plays = [_play_row_to_dict(r, moves[r["id"]]) for r in rows]
+
+    return RawJSONResponse(dumps({
+        "hole_plays": plays,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "pages": math.ceil(total / limit) if total > 0 else 0,
+    }))
+
+
+# Plays per export page; also bounds the IN (...) list used to load their moves
+EXPORT_PAGE_SIZE = 500
+
+
+def _export_lines(after_id: int, conditions: list[str], params: list):
+    """
+    Yield NDJSON chunks, one play (with its moves) per line, in id order.
+
+    Plays are read a page at a time with keyset pagination (id > last id
+    sent), each page on its own short-lived connection. No connection is held
+    between chunks, so a slow or vanished client pins nothing (not even a
+    read snapshot that would stall WAL checkpoints), and memory stays
+    constant no matter how many plays are exported.
+    """
+    where = " AND ".join(["hp.id > ?", *conditions])
+    last_id = after_id
+    while True:
+        with get_db() as conn:
+            plays = conn.execute(
+                f"{PLAY_JOIN_QUERY} WHERE {where} ORDER BY hp.id LIMIT ?",
+                [last_id, *params, EXPORT_PAGE_SIZE],
+            ).fetchall()
+            moves = _fetch_moves(conn, [p["id"] for p in plays])
+        if not plays:
+            return
+        yield b"".join(dumps(_play_row_to_dict(p, moves[p["id"]])) + b"\n" for p in plays)
+        if len(plays) < EXPORT_PAGE_SIZE:
+            return
+        last_id = plays[-1]["id"]
+
 
-    return HolePlayListResponse(
-        hole_plays=plays,
-        total=total,
-        page=page,
-        limit=limit,
-        pages=math.ceil(total / limit) if total > 0 else 0,
+@router.get("/export")
+def export_hole_plays(
+    hole_id: int | None = None,
+    user_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    after_id: int = Query(0, ge=0),
+):
+    """
+    Stream every matching play with its moves as NDJSON, ordered by id.
+
+    To resume an interrupted export, pass the last id received as `after_id`.
+    """
+    conditions = []
+    params: list = []
+
+    if hole_id is not None:
+        conditions.append("hp.hole_id = ?")
+        params.append(hole_id)
+    if user_id is not None:
+        conditions.append("hp.user_id = ?")
+        params.append(user_id)
+    if since is not None:
+        conditions.append("hp.created_at >= ?")
+        params.append(sqlite_timestamp(since))
+    if until is not None:
+        conditions.append("hp.created_at < ?")
+        params.append(sqlite_timestamp(until))
+
+    # Connections are opened inside the generator, page by page, so nothing
+    # leaks if the client disconnects before the first chunk
+    return StreamingResponse(
+        _export_lines(after_id, conditions, params),
+        media_type="application/x-ndjson",
     )
 
 
@@ -133,25 +252,9 @@ def create_hole_play(req: HolePlayCreateRequest, user: dict = Depends(require_us
                 detail="Hole not found",
             )
 
-        stroke_count = len(req.moves)
-        cursor = conn.execute(
-            "INSERT INTO hole_plays (hole_id, user_id, strokes) VALUES (?, ?, ?)",
-            (req.hole_id, user["id"], stroke_count),
+        play_id = insert_hole_play(
+            conn, req.hole_id, user["id"],
+            [(m.from_x, m.from_y, m.to_x, m.to_y) for m in req.moves],
         )
-        play_id = cursor.lastrowid
-
-        for i, move in enumerate(req.moves):
-            conn.execute(
-                """
-                INSERT INTO hole_play_moves (hole_play_id, move_order, from_x, from_y, to_x, to_y)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (play_id, i, move.from_x, move.from_y, move.to_x, move.to_y),
-            )
-
-        row = conn.execute(
-            f"{PLAY_JOIN_QUERY} WHERE hp.id = ?",
-            (play_id,),
-        ).fetchone()
 
-        return _build_hole_play_response(conn, row)
+        return load_hole_play(conn, play_id)
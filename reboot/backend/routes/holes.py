@@ -1,63 +1,150 @@
 import math
-from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
 from schemas import HoleCreateRequest, HoleResponse, HoleListResponse
 from auth import require_user
+import http_cache
 from db import get_db
-from routes.terrain import save_terrain_thumbnail
-
-router = APIRouter()
+from fast_json import RawJSONResponse, dumps
+from hole_features import FEATURE_COLUMNS, feature_values, features_from_row, save_hole_features
+from profiling import ProfiledRoute
+from routes.terrain import get_terrain, save_terrain_thumbnail
+
+router = APIRouter(route_class=ProfiledRoute)
+
+HOLE_COLUMNS = f"""
+    SELECT h.id, h.name, h.seed, h.width, h.height, h.author_id, h.created_at,
+           u.username AS author_name, {", ".join("f." + c for c in FEATURE_COLUMNS)}
+"""
+HOLE_QUERY = f"""
+    {HOLE_COLUMNS}
+    FROM holes h
+    LEFT JOIN users u ON h.author_id = u.id
+    LEFT JOIN hole_features f ON f.hole_id = h.id
+"""
+# Feature filters and sorts start from hole_features so its indexes drive the scan
+FEATURE_HOLE_QUERY = f"""
+    {HOLE_COLUMNS}
+    FROM hole_features f
+    JOIN holes h ON h.id = f.hole_id
+    LEFT JOIN users u ON h.author_id = u.id
+"""
+
+# sort name -> hole_features column; "recent" sorts by creation date
+SORT_COLUMNS = {
+    "fairway": "f.fairway_fraction",
+    "sand": "f.sand_fraction",
+    "trees": "f.tree_fraction",
+    "water": "f.water_fraction",
+    "distance": "f.distance",
+    "par": "f.par",
+    "obstacles": "f.obstacle_density",
+}
+
+
+def row_to_hole_dict(row) -> dict:
+    """Shape a holes row exactly like HoleResponse."""
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "seed": row["seed"],
+        "width": row["width"],
+        "height": row["height"],
+        "author_id": row["author_id"],
+        "author_name": row["author_name"],
+        "created_at": str(row["created_at"]),
+        "features": features_from_row(row),
+    }
 
 
 def _row_to_hole_response(row) -> HoleResponse:
-    d = dict(row)
-    return HoleResponse(
-        id=d["id"],
-        name=d["name"],
-        seed=d["seed"],
-        width=d["width"],
-        height=d["height"],
-        author_id=d["author_id"],
-        author_name=d.get("author_name"),
-        created_at=str(d["created_at"]),
-    )
+    return HoleResponse(**row_to_hole_dict(row))
 
 
 @router.get("", response_model=HoleListResponse)
-def list_holes(page: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100)):
+def list_holes(
+    page: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    sort: str = Query("recent"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    min_fairway: float | None = Query(None, ge=0, le=1),
+    max_fairway: float | None = Query(None, ge=0, le=1),
+    min_sand: float | None = Query(None, ge=0, le=1),
+    max_sand: float | None = Query(None, ge=0, le=1),
+    min_trees: float | None = Query(None, ge=0, le=1),
+    max_trees: float | None = Query(None, ge=0, le=1),
+    min_water: float | None = Query(None, ge=0, le=1),
+    max_water: float | None = Query(None, ge=0, le=1),
+    min_distance: float | None = Query(None, ge=0),
+    max_distance: float | None = Query(None, ge=0),
+    min_par: int | None = Query(None, ge=1),
+    max_par: int | None = Query(None, ge=1),
+    max_obstacles: float | None = Query(None, ge=0, le=1),
+):
+    """List holes, optionally filtered and sorted by precomputed terrain features."""
     offset = page * limit
+    direction = order.upper()
+    conditions = []
+    params: list = []
+
+    bounds = [
+        ("f.fairway_fraction", min_fairway, max_fairway),
+        ("f.sand_fraction", min_sand, max_sand),
+        ("f.tree_fraction", min_trees, max_trees),
+        ("f.water_fraction", min_water, max_water),
+        ("f.distance", min_distance, max_distance),
+        ("f.par", min_par, max_par),
+        ("f.obstacle_density", None, max_obstacles),
+    ]
+    for column, low, high in bounds:
+        if low is not None:
+            conditions.append(f"{column} >= ?")
+            params.append(low)
+        if high is not None:
+            conditions.append(f"{column} <= ?")
+            params.append(high)
+
+    sort_column = SORT_COLUMNS.get(sort)
+    if sort_column is not None:
+        order_clause = f"{sort_column} {direction}, f.hole_id {direction}"
+    else:
+        order_clause = f"h.created_at {direction}"
+
+    where_clause = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    if conditions or sort_column is not None:
+        query = FEATURE_HOLE_QUERY
+        count_query = f"SELECT COUNT(*) AS cnt FROM hole_features f {where_clause}"
+    else:
+        query = HOLE_QUERY
+        count_query = "SELECT COUNT(*) AS cnt FROM holes"
+
     with get_db() as conn:
         rows = conn.execute(
-            """
-            SELECT h.id, h.name, h.seed, h.width, h.height, h.author_id, h.created_at,
-                   u.username AS author_name
-            FROM holes h
-            LEFT JOIN users u ON h.author_id = u.id
-            ORDER BY h.created_at DESC
+            f"""
+            {query}
+            {where_clause}
+            ORDER BY {order_clause}
             LIMIT ? OFFSET ?
             """,
-            (limit, offset),
+            params + [limit, offset],
         ).fetchall()
 
-        total = conn.execute("SELECT COUNT(*) AS cnt FROM holes").fetchone()["cnt"]
+        total = conn.execute(count_query, params).fetchone()["cnt"]
 
-    return HoleListResponse(
-        holes=[_row_to_hole_response(r) for r in rows],
-        total=total,
-        page=page,
-        limit=limit,
-        pages=math.ceil(total / limit) if total > 0 else 0,
-    )
+    return RawJSONResponse(dumps({
+        "holes": [row_to_hole_dict(r) for r in rows],
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "pages": math.ceil(total / limit) if total > 0 else 0,
+    }))
 
 
 @router.get("/{hole_id}", response_model=HoleResponse)
-def get_hole(hole_id: int):
+def get_hole(hole_id: int, request: Request):
     with get_db() as conn:
         row = conn.execute(
-            """
-            SELECT h.id, h.name, h.seed, h.width, h.height, h.author_id, h.created_at,
-                   u.username AS author_name
-            FROM holes h
-            LEFT JOIN users u ON h.author_id = u.id
+            f"""
+            {HOLE_QUERY}
             WHERE h.id = ?
             """,
             (hole_id,),
@@ -66,7 +153,8 @@ def get_hole(hole_id: int):
     if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hole not found")
 
-    return _row_to_hole_response(row)
+    entry = http_cache.EncodedBody(dumps(row_to_hole_dict(row)))
+    return http_cache.respond(request, entry, http_cache.REVALIDATE)
 
 
 @router.post("", response_model=HoleResponse, status_code=status.HTTP_201_CREATED)
@@ -83,24 +171,29 @@ def create_hole(req: HoleCreateRequest, user: dict = Depends(require_user)):
                 detail="A hole with this seed and dimensions already exists",
             )
 
+        # Generated after the check (no wasted work on 409s) and before the
+        # INSERT, so the write lock is not held while it runs
+        data = get_terrain(req.seed, req.width, req.height)
+        features = feature_values(data)
+
         cursor = conn.execute(
             "INSERT INTO holes (name, seed, width, height, author_id) VALUES (?, ?, ?, ?, ?)",
             (req.name, req.seed, req.width, req.height, user["id"]),
         )
         hole_id = cursor.lastrowid
 
+        # Index the terrain's features in the same transaction as the hole
+        save_hole_features(conn, [(hole_id, features)])
+
         row = conn.execute(
-            """
-            SELECT h.id, h.name, h.seed, h.width, h.height, h.author_id, h.created_at,
-                   u.username AS author_name
-            FROM holes h
-            LEFT JOIN users u ON h.author_id = u.id
+            f"""
+            {HOLE_QUERY}
             WHERE h.id = ?
             """,
             (hole_id,),
         ).fetchone()
 
     # Persist the terrain thumbnail to disk now that the hole is saved
-    save_terrain_thumbnail(req.seed, req.width, req.height)
+    save_terrain_thumbnail(req.seed, req.width, req.height, data)
 
     return _row_to_hole_response(row)
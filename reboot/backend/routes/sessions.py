@@ -0,0 +1,136 @@
+from fastapi import APIRouter, HTTPException, Depends, status
+from schemas import (
+    HolePlayResponse,
+    SessionCreateRequest,
+    SessionResponse,
+    StrokeRequest,
+    StrokeResponse,
+)
+from auth import require_user
+from cache import TTLCache
+from db import get_db
+from profiling import ProfiledRoute
+from routes.holeplays import insert_hole_play, load_hole_play
+from routes.terrain import get_terrain
+from sessions import InvalidStroke, PlaySession, store
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# (seed, width, height) -> (grid rows, ball, hole), shared by all sessions on a hole
+_grids = TTLCache("session_terrain", maxsize=512, ttl=3600)
+
+
+def _session_terrain(seed: str, width: int, height: int) -> tuple:
+    key = (seed, width, height)
+    entry = _grids.get(key)
+    if entry is None:
+        data = get_terrain(seed, width, height)
+        entry = (
+            tuple("".join(row) for row in data["map"]),
+            tuple(data["ball_position"]),
+            tuple(data["hole_position"]),
+        )
+        _grids.set(key, entry)
+    return entry
+
+
+def _session_to_dict(session: PlaySession, with_moves: bool = True) -> dict:
+    return {
+        "id": session.id,
+        "hole_id": session.hole_id,
+        "user_id": session.user_id,
+        "user_name": session.user_name,
+        "ball_position": list(session.ball),
+        "hole_position": list(session.hole),
+        "strokes": len(session.moves),
+        "max_roll": session.max_roll,
+        "at_hole": session.at_hole,
+        "started_at": session.started_at,
+        "last_active": session.last_active,
+        "moves": [
+            {"from_x": fx, "from_y": fy, "to_x": tx, "to_y": ty}
+            for fx, fy, tx, ty in session.moves
+        ] if with_moves else [],
+    }
+
+
+def _get_session(session_id: str) -> PlaySession:
+    session = store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found or expired")
+    return session
+
+
+def _get_own_session(session_id: str, user: dict) -> PlaySession:
+    session = _get_session(session_id)
+    if session.user_id != user["id"]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your session")
+    return session
+
+
+@router.post("", response_model=SessionResponse, status_code=status.HTTP_201_CREATED)
+def start_session(req: SessionCreateRequest, user: dict = Depends(require_user)):
+    """Start playing a hole; strokes are then appended one at a time."""
+    with get_db() as conn:
+        hole = conn.execute(
+            "SELECT seed, width, height FROM holes WHERE id = ?", (req.hole_id,)
+        ).fetchone()
+    if hole is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hole not found")
+
+    grid, ball, hole_position = _session_terrain(hole["seed"], hole["width"], hole["height"])
+    session = PlaySession(user, req.hole_id, grid, ball, hole_position)
+    store.add(session)
+    return _session_to_dict(session)
+
+
+@router.get("", response_model=list[SessionResponse])
+def list_sessions(hole_id: int | None = None):
+    """Sessions in progress (on this worker), for spectating."""
+    return [_session_to_dict(s, with_moves=False) for s in store.active(hole_id)]
+
+
+@router.get("/{session_id}", response_model=SessionResponse)
+def get_session(session_id: str):
+    """Current state of a session, including every stroke so far."""
+    return _session_to_dict(_get_session(session_id))
+
+
+@router.post("/{session_id}/strokes", response_model=StrokeResponse)
+def append_stroke(session_id: str, req: StrokeRequest, user: dict = Depends(require_user)):
+    """Play one stroke from the current ball position. Landing where the ball lies records a wasted stroke."""
+    session = _get_own_session(session_id, user)
+    try:
+        store.append_stroke(session, req.to_x, req.to_y)
+    except InvalidStroke as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    return {
+        "strokes": len(session.moves),
+        "ball_position": list(session.ball),
+        "max_roll": session.max_roll,
+        "at_hole": session.at_hole,
+    }
+
+
+@router.post("/{session_id}/finish", response_model=HolePlayResponse, status_code=status.HTTP_201_CREATED)
+def finish_session(session_id: str, user: dict = Depends(require_user)):
+    """Save a holed-out session as a hole play (one transaction) and close it."""
+    session = _get_own_session(session_id, user)
+    if not session.at_hole:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Ball is not in the hole yet")
+    # Taken out of the store first so a concurrent finish cannot save it twice
+    if store.remove(session.id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found or expired")
+
+    try:
+        with get_db() as conn:
+            play_id = insert_hole_play(conn, session.hole_id, session.user_id, session.moves)
+            return load_hole_play(conn, play_id)
+    except Exception:
+        store.add(session)
+        raise
+
+
+@router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+def abandon_session(session_id: str, user: dict = Depends(require_user)):
+    store.remove(_get_own_session(session_id, user).id)
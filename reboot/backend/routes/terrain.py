@@ -1,17 +1,30 @@
 import io
 import os
+import threading
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
 from fastapi.responses import FileResponse, StreamingResponse
-from PIL import Image
 
-from terrain import generate_full_terrain
+import http_cache
+import metrics
+from cache import TTLCache
+from fast_json import dumps
+from profiling import ProfiledRoute
+from terrain import generate_full_terrain, timed_generate_full_terrain
+from terrain_store import TerrainStore
 
-router = APIRouter()
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
 
-CACHE_DIR = Path(os.path.dirname(__file__)).parent / "terrain_cache"
-CACHE_DIR.mkdir(exist_ok=True)
+    from PIL import Image
+
+router = APIRouter(route_class=ProfiledRoute)
+
+CACHE_DIR = Path(os.environ.get(
+    "TERRAIN_CACHE_DIR", str(Path(os.path.dirname(__file__)).parent / "terrain_cache")
+))
 
 # Tile colours matching the frontend SVG palette
 TILE_COLORS: dict[str, tuple[int, int, int]] = {
@@ -25,9 +38,123 @@ HOLE_COLOR = (0x11, 0x11, 0x11)
 START_COLOR = (0xAA, 0x33, 0x8A)
 PX_PER_TILE = 6
 
+# Bump when generate_full_terrain's output changes, so cached ETags go stale
+TERRAIN_VERSION = "1"
+TERRAIN_RESPONSE_CACHE_SIZE = int(os.environ.get("TERRAIN_RESPONSE_CACHE_SIZE", "256"))
+
+# Encoded (and lazily compressed) /generate bodies for hot seeds
+_terrain_responses = TTLCache("terrain_responses", maxsize=TERRAIN_RESPONSE_CACHE_SIZE, ttl=24 * 3600)
+
+# Packed grids shared by all workers on the host (TERRAIN_STORE_MB=0 disables it)
+TERRAIN_STORE_PATH = Path(os.environ.get("TERRAIN_STORE_PATH", str(CACHE_DIR / "terrain_store.db")))
+TERRAIN_STORE_MB = int(os.environ.get("TERRAIN_STORE_MB", "64"))
+_store = (
+    TerrainStore(TERRAIN_STORE_PATH, TERRAIN_STORE_MB * 1024 * 1024, version=int(TERRAIN_VERSION))
+    if TERRAIN_STORE_MB > 0 else None
+)
+
+# Processes generating terrain for multi-hole requests (0 = generate inline)
+TERRAIN_WORKERS = int(os.environ.get("TERRAIN_WORKERS", str(min(os.cpu_count() or 1, 4))))
+_pool: Optional["ProcessPoolExecutor"] = None
+_pool_lock = threading.Lock()
+
+GENERATION_SECONDS = metrics.histogram(
+    "egolf_terrain_generation_seconds",
+    "Time spent in generate_full_terrain",
+)
+RENDER_SECONDS = metrics.histogram(
+    "egolf_terrain_render_seconds",
+    "Time spent rendering and encoding terrain PNGs",
+)
+THUMBNAIL_CACHE_FILES = metrics.gauge(
+    "egolf_thumbnail_cache_files",
+    "PNG thumbnails persisted in terrain_cache/",
+)
+THUMBNAIL_CACHE_BYTES = metrics.gauge(
+    "egolf_thumbnail_cache_bytes",
+    "Total size of the PNG thumbnails persisted in terrain_cache/",
+)
+
+
+@metrics.register_collector
+def _collect_thumbnail_cache() -> None:
+    files = 0
+    size = 0
+    if CACHE_DIR.is_dir():
+        with os.scandir(CACHE_DIR) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".png"):
+                    files += 1
+                    size += entry.stat().st_size
+    THUMBNAIL_CACHE_FILES.set(files)
+    THUMBNAIL_CACHE_BYTES.set(size)
+
+
+def get_terrain(seed: str, width: int, height: int) -> dict:
+    """Terrain for a seed, from the shared store or generated (timed) and stored."""
+    if _store is not None:
+        data = _store.get(seed, width, height)
+        if data is not None:
+            return data
+    with GENERATION_SECONDS.time():
+        data = generate_full_terrain(seed, width, height)
+    if _store is not None:
+        _store.put(data)
+    return data
+
+
+def _get_pool() -> "ProcessPoolExecutor":
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Imported here so workers that never build a bundle stay light
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            _pool = ProcessPoolExecutor(
+                max_workers=TERRAIN_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
 
-def _render_terrain_image(data: dict) -> Image.Image:
+
+def shutdown_pool() -> None:
+    """Stop the terrain worker processes (called on app shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def get_terrains(keys: list[tuple[str, int, int]]) -> list[dict]:
+    """
+    Terrains for many (seed, width, height) keys, in order. Those missing from
+    the shared store are generated in parallel on a process pool.
+    """
+    results: list[Optional[dict]] = [
+        _store.get(*key) if _store is not None else None for key in keys
+    ]
+    missing = [i for i, data in enumerate(results) if data is None]
+    if len(missing) > 1 and TERRAIN_WORKERS > 0:
+        generated = _get_pool().map(timed_generate_full_terrain, *zip(*(keys[i] for i in missing)))
+        for i, (data, seconds) in zip(missing, generated):
+            # Timed in the worker, so the histogram counts generation only
+            GENERATION_SECONDS.observe(seconds)
+            results[i] = data
+            if _store is not None:
+                _store.put(data)
+    else:
+        for i in missing:
+            results[i] = get_terrain(*keys[i])
+    return results
+
+
+def _render_terrain_image(data: dict) -> "Image.Image":
     """Render a terrain map dict to a PIL Image (in memory)."""
+    # Pillow is imported on first render to keep worker start-up fast
+    from PIL import Image
+
     grid = data["map"]
     h = len(grid)
     w = len(grid[0]) if h else 0
@@ -53,31 +180,60 @@ def _render_terrain_image(data: dict) -> Image.Image:
     return img
 
 
-def _image_to_bytes(img: Image.Image) -> bytes:
+def _image_to_bytes(img: "Image.Image") -> bytes:
     buf = io.BytesIO()
     img.save(buf, format="PNG", optimize=True)
     return buf.getvalue()
 
 
-def save_terrain_thumbnail(seed: str, width: int, height: int) -> Path:
-    """Generate the terrain thumbnail and persist it to disk. Returns the file path."""
-    filename = f"{seed}_{width}x{height}.png"
-    path = CACHE_DIR / filename
+def thumbnail_path(seed: str, width: int, height: int) -> Path:
+    return CACHE_DIR / f"{seed}_{width}x{height}.png"
+
+
+def save_terrain_thumbnail(seed: str, width: int, height: int, data: Optional[dict] = None) -> Path:
+    """
+    Generate the terrain thumbnail and persist it to disk. Returns the file path.
+    Pass `data` when the terrain has already been generated.
+    """
+    path = thumbnail_path(seed, width, height)
     if not path.exists():
-        data = generate_full_terrain(seed, width, height)
-        img = _render_terrain_image(data)
-        img.save(path, format="PNG", optimize=True)
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        if data is None:
+            data = get_terrain(seed, width, height)
+        with RENDER_SECONDS.time():
+            png_bytes = _image_to_bytes(_render_terrain_image(data))
+        # Write to a temp file and rename, so concurrent writers (other
+        # workers, prewarm.py) never expose a half-written PNG
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(png_bytes)
+        os.replace(tmp, path)
     return path
 
 
+def terrain_etag(seed: str, width: int, height: int) -> str:
+    """Strong ETag for a terrain payload, known without generating it."""
+    return http_cache.make_etag(f"{TERRAIN_VERSION}:{seed}:{width}x{height}".encode("utf-8"))
+
+
 @router.get("/generate")
 def generate(
+    request: Request,
     seed: str = Query(min_length=8, max_length=8),
     width: int = Query(ge=5, le=100),
     height: int = Query(ge=5, le=100),
 ):
     """Generate terrain from a seed and dimensions. Returns the map grid, positions, and par."""
-    return generate_full_terrain(seed, width, height)
+    etag = terrain_etag(seed, width, height)
+    # Terrain is a pure function of its inputs: revalidation needs no work at all
+    if http_cache.is_not_modified(request, etag):
+        return http_cache.not_modified_response(etag, http_cache.IMMUTABLE)
+
+    key = (seed, width, height)
+    entry = _terrain_responses.get(key)
+    if entry is None:
+        entry = http_cache.EncodedBody(dumps(get_terrain(seed, width, height)), etag=etag)
+        _terrain_responses.set(key, entry)
+    return http_cache.respond(request, entry, http_cache.IMMUTABLE)
 
 
 @router.get("/preview")
@@ -100,9 +256,10 @@ def preview_draft(
     height: int = Query(ge=5, le=100),
 ):
     """Return a PNG preview generated in memory — nothing is saved to disk."""
-    data = generate_full_terrain(seed, width, height)
-    img = _render_terrain_image(data)
-    png_bytes = _image_to_bytes(img)
+    data = get_terrain(seed, width, height)
+    with RENDER_SECONDS.time():
+        img = _render_terrain_image(data)
+        png_bytes = _image_to_bytes(img)
     return StreamingResponse(
         io.BytesIO(png_bytes),
         media_type="image/png",
@@ -37,6 +37,17 @@ class HoleCreateRequest(BaseModel):
     height: int = Field(ge=5, le=100)
 
 
+class HoleFeatures(BaseModel):
+    grass_fraction: float
+    fairway_fraction: float
+    sand_fraction: float
+    tree_fraction: float
+    water_fraction: float
+    distance: float
+    par: int
+    obstacle_density: float
+
+
 class HoleResponse(BaseModel):
     id: int
     name: str
@@ -46,6 +57,7 @@ class HoleResponse(BaseModel):
     author_id: Optional[int]
     author_name: Optional[str] = None
     created_at: str
+    features: Optional[HoleFeatures] = None
 
 
 class HoleListResponse(BaseModel):
@@ -99,3 +111,68 @@ class HolePlayListResponse(BaseModel):
     page: int
     limit: int
     pages: int
+
+
+# --- Play Sessions ---
+
+class SessionCreateRequest(BaseModel):
+    hole_id: int
+
+
+class StrokeRequest(BaseModel):
+    to_x: int
+    to_y: int
+
+
+class StrokeResponse(BaseModel):
+    strokes: int
+    ball_position: list[int]
+    max_roll: int
+    at_hole: bool
+
+
+class SessionResponse(BaseModel):
+    id: str
+    hole_id: int
+    user_id: int
+    user_name: str
+    ball_position: list[int]
+    hole_position: list[int]
+    strokes: int
+    max_roll: int
+    at_hole: bool
+    started_at: float
+    last_active: float
+    moves: list[MoveData] = []
+
+
+# --- Courses ---
+
+class CourseCreateRequest(BaseModel):
+    name: str = Field(min_length=1, max_length=200)
+    hole_ids: list[int] = Field(min_length=1, max_length=18)
+
+
+class CourseUpdateRequest(BaseModel):
+    name: Optional[str] = Field(default=None, min_length=1, max_length=200)
+    hole_ids: Optional[list[int]] = Field(default=None, min_length=1, max_length=18)
+
+
+class CourseResponse(BaseModel):
+    id: int
+    name: str
+    author_id: Optional[int]
+    author_name: Optional[str] = None
+    revision: int
+    hole_count: int
+    created_at: str
+    updated_at: str
+    holes: list[HoleResponse] = []
+
+
+class CourseListResponse(BaseModel):
+    courses: list[CourseResponse]
+    total: int
+    page: int
+    limit: int
+    pages: int
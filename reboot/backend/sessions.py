@@ -0,0 +1,182 @@
+"""
+In-memory store for play sessions in progress.
+
+A session tracks one player's ball on one hole while they play, so strokes
+can be sent (and spectated) one at a time instead of uploading the whole
+round at the end. Each session keeps the terrain grid as a tuple of row
+strings (shared by every session on the same hole), the ball position and
+the strokes played so far as (from_x, from_y, to_x, to_y) tuples.
+
+Sessions are dropped after SESSION_IDLE_SECONDS without a stroke; eviction
+happens lazily on store access, oldest first, so it costs nothing when there
+is nothing to evict. The store lives in the worker's memory: with several
+workers, requests for a session must reach the worker that started it.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import metrics
+
+SESSION_IDLE_SECONDS = int(os.environ.get("SESSION_IDLE_SECONDS", "1800"))
+SESSION_MAX = int(os.environ.get("SESSION_MAX", "10000"))
+
+# Largest die per tile the ball lies on (matches the frontend's dice rules)
+MAX_ROLL = {"s": 2, "f": 8}
+DEFAULT_MAX_ROLL = 6
+BLOCKED_TILES = ("t", "w")
+
+# The eight stroke directions; diagonal strokes move ceil(0.707 * roll) tiles
+# on each axis, precomputed per maximum roll so validating a stroke is a set
+# lookup
+DIRECTIONS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+DIAGONAL_STEPS = {
+    max_roll: frozenset(math.ceil(0.707 * roll) for roll in range(1, max_roll + 1))
+    for max_roll in {DEFAULT_MAX_ROLL, *MAX_ROLL.values()}
+}
+
+ACTIVE_SESSIONS = metrics.gauge("egolf_play_sessions_active", "Play sessions in progress")
+SESSION_STROKES = metrics.counter("egolf_play_session_strokes_total", "Strokes appended to play sessions", ("result",))
+SESSIONS_EVICTED = metrics.counter("egolf_play_sessions_evicted_total", "Play sessions dropped for being idle or over SESSION_MAX")
+
+
+class InvalidStroke(Exception):
+    """Raised when a stroke is not reachable from the current ball position."""
+
+
+class PlaySession:
+    __slots__ = (
+        "id", "user_id", "user_name", "hole_id", "grid", "width", "height",
+        "hole", "ball", "moves", "started_at", "last_active",
+    )
+
+    def __init__(self, user: dict, hole_id: int, grid: tuple[str, ...], ball: tuple[int, int], hole: tuple[int, int]):
+        self.id = secrets.token_urlsafe(12)
+        self.user_id = user["id"]
+        self.user_name = user["username"]
+        self.hole_id = hole_id
+        self.grid = grid
+        self.height = len(grid)
+        self.width = len(grid[0]) if grid else 0
+        self.hole = hole
+        self.ball = ball
+        self.moves: list[tuple[int, int, int, int]] = []
+        self.started_at = self.last_active = time.time()
+
+    @property
+    def max_roll(self) -> int:
+        x, y = self.ball
+        return MAX_ROLL.get(self.grid[y][x], DEFAULT_MAX_ROLL)
+
+    @property
+    def at_hole(self) -> bool:
+        return self.ball == self.hole
+
+    def landing_positions(self, roll: int) -> list[tuple[int, int]]:
+        """Tiles a roll can land on from the ball (the frontend's getLandingPositions)."""
+        x, y = self.ball
+        diagonal = math.ceil(0.707 * roll)
+        positions = []
+        for dx, dy in DIRECTIONS:
+            step = diagonal if dx and dy else roll
+            to_x, to_y = x + dx * step, y + dy * step
+            if 0 <= to_x < self.width and 0 <= to_y < self.height and self.grid[to_y][to_x] not in BLOCKED_TILES:
+                positions.append((to_x, to_y))
+        return positions
+
+    def check_stroke(self, to_x: int, to_y: int) -> None:
+        """Raise InvalidStroke unless (to_x, to_y) is a legal landing tile. O(1)."""
+        if self.at_hole:
+            raise InvalidStroke("Ball is already in the hole")
+        if not (0 <= to_x < self.width and 0 <= to_y < self.height):
+            raise InvalidStroke("Target is off the map")
+        x, y = self.ball
+        dx, dy = abs(to_x - x), abs(to_y - y)
+        if dx == 0 and dy == 0:
+            # A wasted stroke: only possible when some roll has nowhere to land
+            if all(self.landing_positions(roll) for roll in range(1, self.max_roll + 1)):
+                raise InvalidStroke("Every roll can land somewhere from here")
+            return
+        if self.grid[to_y][to_x] in BLOCKED_TILES:
+            raise InvalidStroke("Cannot land on trees or water")
+        max_roll = self.max_roll
+        if dx == 0 or dy == 0:
+            if dx + dy > max_roll:
+                raise InvalidStroke(f"Too far: at most {max_roll} tiles from here")
+        elif dx == dy:
+            if dx not in DIAGONAL_STEPS[max_roll]:
+                raise InvalidStroke("No roll lands on that diagonal tile")
+        else:
+            raise InvalidStroke("Strokes go straight or diagonally")
+
+
+class SessionStore:
+    """Thread-safe map of session id -> PlaySession, ordered by last activity."""
+
+    def __init__(self, idle_seconds: float = SESSION_IDLE_SECONDS, maxsize: int = SESSION_MAX):
+        self.idle_seconds = idle_seconds
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._sessions: OrderedDict[str, PlaySession] = OrderedDict()
+
+    def _evict_idle(self) -> None:
+        cutoff = time.time() - self.idle_seconds
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_active > cutoff and len(self._sessions) <= self.maxsize:
+                break
+            self._sessions.popitem(last=False)
+            SESSIONS_EVICTED.inc()
+
+    def add(self, session: PlaySession) -> None:
+        with self._lock:
+            self._sessions[session.id] = session
+            self._evict_idle()
+
+    def get(self, session_id: str) -> Optional[PlaySession]:
+        with self._lock:
+            self._evict_idle()
+            return self._sessions.get(session_id)
+
+    def active(self, hole_id: Optional[int] = None) -> list[PlaySession]:
+        with self._lock:
+            self._evict_idle()
+            return [s for s in self._sessions.values() if hole_id is None or s.hole_id == hole_id]
+
+    def append_stroke(self, session: PlaySession, to_x: int, to_y: int) -> None:
+        with self._lock:
+            try:
+                if session.id not in self._sessions:
+                    raise InvalidStroke("Session is closed")
+                session.check_stroke(to_x, to_y)
+            except InvalidStroke:
+                SESSION_STROKES.inc(result="rejected")
+                raise
+            session.moves.append((*session.ball, to_x, to_y))
+            session.ball = (to_x, to_y)
+            session.last_active = time.time()
+            self._sessions.move_to_end(session.id)
+        SESSION_STROKES.inc(result="accepted")
+
+    def remove(self, session_id: str) -> Optional[PlaySession]:
+        """Remove a session; returns it, or None if another request got there first."""
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+store = SessionStore()
+
+
+@metrics.register_collector
+def _collect_sessions() -> None:
+    ACTIVE_SESSIONS.set(len(store))
@@ -0,0 +1,85 @@
+"""
+Start-up budget check for API workers.
+
+Usage:
+    python startup_budget.py                 # Check against the default budget
+    python startup_budget.py --budget 600    # Budget in milliseconds
+
+Imports `main` in fresh interpreters under `python -X importtime` and fails
+(exit code 1) when the import takes longer than the budget, or when a module
+that should only load on first use (Pillow, multiprocessing...) is imported
+eagerly. The best of several runs is used to smooth out noise.
+"""
+
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUDGET_MS = int(os.environ.get("STARTUP_BUDGET_MS", "800"))
+RUNS = 3
+
+# Heavy modules that must stay out of the import path of `main`
+LAZY_MODULES = ("PIL", "multiprocessing", "concurrent.futures.process")
+
+
+def measure_import() -> tuple[float, set[str]]:
+    """Return (cumulative import time of main in ms, imported module names)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        modules.add(name.strip())
+        if name.strip() == "main":
+            total_us = int(cumulative)
+    return total_us / 1000, modules
+
+
+def eager_modules(modules: set[str]) -> list[str]:
+    """Modules from LAZY_MODULES (or their submodules) found in `modules`."""
+    return sorted(
+        m for m in modules
+        if any(m == lazy or m.startswith(lazy + ".") for lazy in LAZY_MODULES)
+    )
+
+
+def main(argv: list[str]) -> None:
+    budget = DEFAULT_BUDGET_MS
+    if "--budget" in argv:
+        budget = int(argv[argv.index("--budget") + 1])
+
+    timings = []
+    modules: set[str] = set()
+    for _ in range(RUNS):
+        ms, modules = measure_import()
+        timings.append(ms)
+    best = min(timings)
+
+    eager = eager_modules(modules)
+
+    print(f"import main: {best:.0f} ms (best of {RUNS}, budget {budget} ms)")
+    failed = False
+    if best > budget:
+        print("  FAIL: start-up is over budget")
+        failed = True
+    if eager:
+        print(f"  FAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("  OK")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
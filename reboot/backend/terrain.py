@@ -11,6 +11,7 @@ Symbol key:
 
 from __future__ import annotations
 import math
+import time
 from typing import Callable
 
 
@@ -219,3 +220,48 @@ def generate_full_terrain(seed: str, w: int, h: int) -> dict:
         "width": w,
         "height": h,
     }
+
+
+def timed_generate_full_terrain(seed: str, w: int, h: int) -> tuple[dict, float]:
+    """generate_full_terrain and the seconds it took, for work sent to another process."""
+    started = time.perf_counter()
+    data = generate_full_terrain(seed, w, h)
+    return data, time.perf_counter() - started
+
+
+# Bump when compute_terrain_features changes, so stored rows get recomputed
+FEATURES_VERSION = 1
+
+_OBSTACLE_TILES = ("t", "w")
+
+
+def compute_terrain_features(data: dict) -> dict:
+    """
+    Summarise a generate_full_terrain() result for indexing and search:
+    the fraction of each tile type, the straight-line ball-to-hole distance
+    (in tiles), par, and the obstacle density (trees and water) inside the
+    rectangle spanned by the ball and the hole.
+    """
+    grid = data["map"]
+    total = sum(len(row) for row in grid) or 1
+    counts = {tile: 0 for tile in "gfstw"}
+    for row in grid:
+        for tile in row:
+            counts[tile] = counts.get(tile, 0) + 1
+
+    (bx, by), (hx, hy) = data["ball_position"], data["hole_position"]
+    x0, x1 = sorted((bx, hx))
+    y0, y1 = sorted((by, hy))
+    corridor = [tile for row in grid[y0:y1 + 1] for tile in row[x0:x1 + 1]]
+    obstacles = sum(1 for tile in corridor if tile in _OBSTACLE_TILES)
+
+    return {
+        "grass_fraction": round(counts["g"] / total, 4),
+        "fairway_fraction": round(counts["f"] / total, 4),
+        "sand_fraction": round(counts["s"] / total, 4),
+        "tree_fraction": round(counts["t"] / total, 4),
+        "water_fraction": round(counts["w"] / total, 4),
+        "distance": round(math.hypot(hx - bx, hy - by), 2),
+        "par": data["par"],
+        "obstacle_density": round(obstacles / (len(corridor) or 1), 4),
+    }
@@ -0,0 +1,209 @@
+"""
+Terrain cache shared by every worker process on a host.
+
+Generated terrains are stored as packed grids in a small SQLite database
+(WAL mode, separate from the app database), keyed by (seed, width, height).
+A grid is packed as one byte per tile, row-major, so a 100x100 terrain is a
+10 KB blob that any worker can read back without re-running
+generate_full_terrain. Several workers may populate the store at once:
+inserts are INSERT OR IGNORE, so the first writer wins and the others'
+identical rows are dropped.
+
+The store is kept under a byte budget. Reads refresh an entry's last-used
+time (at most once per TOUCH_INTERVAL, to keep reads mostly write-free), and
+every EVICT_EVERY inserts the least recently used entries are deleted until
+the store is back under budget. Its size is a running total in the one-row
+terrain_size table, kept by triggers on every insert and delete (whichever
+worker makes them), so neither eviction nor a metrics scrape sums the grids. Any SQLite error (a locked or corrupt file)
+is treated as a miss: the cache must never fail a request.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import metrics
+from cache import CACHE_HITS, CACHE_MISSES
+
+NAME = "terrain_store"
+TOUCH_INTERVAL = 60
+EVICT_EVERY = 64
+
+STORE_BYTES = metrics.gauge("egolf_terrain_store_bytes", "Packed grid bytes held in the shared terrain store")
+STORE_ERRORS = metrics.counter("egolf_terrain_store_errors_total", "SQLite errors raised by the shared terrain store")
+STORE_EVICTIONS = metrics.counter("egolf_terrain_store_evictions_total", "Entries evicted from the shared terrain store")
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS terrain (
+        seed TEXT NOT NULL,
+        width INTEGER NOT NULL,
+        height INTEGER NOT NULL,
+        grid BLOB NOT NULL,
+        ball_x INTEGER NOT NULL,
+        ball_y INTEGER NOT NULL,
+        hole_x INTEGER NOT NULL,
+        hole_y INTEGER NOT NULL,
+        par INTEGER NOT NULL,
+        last_used REAL NOT NULL,
+        PRIMARY KEY (seed, width, height)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_terrain_last_used ON terrain(last_used);
+    BEGIN IMMEDIATE;
+    CREATE TABLE IF NOT EXISTS terrain_size (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        bytes INTEGER NOT NULL
+    );
+    -- Seeded once, in the same transaction that creates the triggers
+    INSERT OR IGNORE INTO terrain_size (id, bytes)
+        SELECT 0, COALESCE(SUM(LENGTH(grid)), 0) FROM terrain;
+    CREATE TRIGGER IF NOT EXISTS terrain_size_insert AFTER INSERT ON terrain BEGIN
+        UPDATE terrain_size SET bytes = bytes + LENGTH(NEW.grid) WHERE id = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS terrain_size_delete AFTER DELETE ON terrain BEGIN
+        UPDATE terrain_size SET bytes = bytes - LENGTH(OLD.grid) WHERE id = 0;
+    END;
+    COMMIT;
+"""
+
+STORES: list["TerrainStore"] = []
+
+
+def pack(data: dict) -> bytes:
+    return "".join("".join(row) for row in data["map"]).encode("ascii")
+
+
+def unpack(seed: str, width: int, height: int, row) -> dict:
+    grid = row["grid"].decode("ascii")
+    ball = [row["ball_x"], row["ball_y"]]
+    return {
+        "map": [list(grid[y * width:(y + 1) * width]) for y in range(height)],
+        "ball_position": ball,
+        "hole_position": [row["hole_x"], row["hole_y"]],
+        "start_position": list(ball),
+        "par": row["par"],
+        "seed": seed,
+        "width": width,
+        "height": height,
+    }
+
+
+class TerrainStore:
+    """SQLite-backed terrain cache; one connection per thread, opened lazily."""
+
+    def __init__(self, path: Path, max_bytes: int, version: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.version = version
+        self._local = threading.local()
+        self._inserts = 0
+        self._inserts_lock = threading.Lock()
+        STORES.append(self)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            # Entries from an older terrain generator are useless: start over
+            if conn.execute("PRAGMA user_version").fetchone()[0] != self.version:
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("PRAGMA user_version").fetchone()[0] != self.version:
+                    conn.execute("DELETE FROM terrain")
+                    conn.execute(f"PRAGMA user_version = {int(self.version)}")
+                conn.execute("COMMIT")
+            self._local.conn = conn
+        return conn
+
+    def get(self, seed: str, width: int, height: int) -> Optional[dict]:
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT * FROM terrain WHERE seed = ? AND width = ? AND height = ?",
+                (seed, width, height),
+            ).fetchone()
+            if row is not None and row["last_used"] < time.time() - TOUCH_INTERVAL:
+                conn.execute(
+                    "UPDATE terrain SET last_used = ? WHERE seed = ? AND width = ? AND height = ?",
+                    (time.time(), seed, width, height),
+                )
+        except sqlite3.Error:
+            STORE_ERRORS.inc()
+            row = None
+        if row is None:
+            CACHE_MISSES.inc(cache=NAME)
+            return None
+        CACHE_HITS.inc(cache=NAME)
+        return unpack(seed, width, height, row)
+
+    def put(self, data: dict) -> None:
+        try:
+            self._connect().execute(
+                """
+                INSERT OR IGNORE INTO terrain
+                    (seed, width, height, grid, ball_x, ball_y, hole_x, hole_y, par, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    data["seed"], data["width"], data["height"], pack(data),
+                    *data["ball_position"], *data["hole_position"], data["par"], time.time(),
+                ),
+            )
+            with self._inserts_lock:
+                self._inserts += 1
+                evict = self._inserts % EVICT_EVERY == 0
+            if evict:
+                self.evict()
+        except sqlite3.Error:
+            STORE_ERRORS.inc()
+
+    def size(self) -> int:
+        return self._connect().execute("SELECT bytes FROM terrain_size WHERE id = 0").fetchone()[0]
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the store is under 90% of its budget."""
+        conn = self._connect()
+        # Size and deletes in one write transaction: another worker evicting
+        # at the same time waits, then sees the reduced size and stops early
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            total = self.size()
+            deleted = 0
+            if total > self.max_bytes:
+                excess = total - int(self.max_bytes * 0.9)
+                for row in conn.execute(
+                    "SELECT seed, width, height, LENGTH(grid) AS size FROM terrain ORDER BY last_used"
+                ).fetchall():
+                    if excess <= 0:
+                        break
+                    conn.execute(
+                        "DELETE FROM terrain WHERE seed = ? AND width = ? AND height = ?",
+                        (row["seed"], row["width"], row["height"]),
+                    )
+                    excess -= row["size"]
+                    deleted += 1
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        if deleted:
+            STORE_EVICTIONS.inc(deleted)
+
+
+@metrics.register_collector
+def _collect_store_size() -> None:
+    total = 0
+    for store in STORES:
+        if store.path.exists():
+            try:
+                total += store.size()
+            except sqlite3.Error:
+                STORE_ERRORS.inc()
+    STORE_BYTES.set(total)
@@ -0,0 +1,75 @@
+"""
+Shared fixtures: the app running against a throwaway database.
+
+The environment is set before any backend module is imported, since they
+read their configuration at import time.
+"""
+
+import os
+import tempfile
+
+_tmpdir = tempfile.mkdtemp(prefix="egolf-tests-")
+os.environ["DATABASE_PATH"] = os.path.join(_tmpdir, "egolf.db")
+os.environ["TERRAIN_CACHE_DIR"] = os.path.join(_tmpdir, "terrain_cache")
+os.environ["TERRAIN_STORE_MB"] = "0"
+os.environ["TERRAIN_WORKERS"] = "0"
+os.environ["ADMISSION_ENABLED"] = "false"
+os.environ["DB_MAINTENANCE_ENABLED"] = "false"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["HASH_WORKERS"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from db import get_db
+from hole_features import feature_values, save_hole_features
+from routes.holeplays import insert_hole_play
+from terrain import generate_full_terrain
+
+HOLES = [
+    ("aaaaaaaa", 12, 20),
+    ("bbbbbbbb", 20, 30),
+    ("cccccccc", 8, 15),
+    ("dddddddd", 25, 40),
+]
+
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def seeded(client) -> dict:
+    """
+    Two users, four holes (the last without indexed features, like a hole
+    the backfill has not reached yet) and a few plays with moves.
+    """
+    with get_db() as conn:
+        user_ids = [
+            conn.execute(
+                "INSERT INTO users (username, email, password_hash) VALUES (?, ?, 'x')",
+                (name, f"{name}@example.com"),
+            ).lastrowid
+            for name in ("alice", "bob")
+        ]
+        hole_ids = [
+            conn.execute(
+                "INSERT INTO holes (name, seed, width, height, author_id) VALUES (?, ?, ?, ?, ?)",
+                (f"Hole {seed[0]}", seed, width, height, user_ids[i % 2]),
+            ).lastrowid
+            for i, (seed, width, height) in enumerate(HOLES)
+        ]
+        save_hole_features(conn, [
+            (hole_id, feature_values(generate_full_terrain(*key)))
+            for hole_id, key in zip(hole_ids[:-1], HOLES)
+        ])
+        play_ids = [
+            insert_hole_play(conn, hole_ids[0], user_ids[0], [(1, 1, 1, 5), (1, 5, 3, 7)]),
+            insert_hole_play(conn, hole_ids[0], user_ids[1], [(1, 1, 2, 2)]),
+            insert_hole_play(conn, hole_ids[1], user_ids[0], []),
+        ]
+    return {"users": user_ids, "holes": hole_ids, "plays": play_ids}
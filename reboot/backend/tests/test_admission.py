@@ -0,0 +1,186 @@
+"""Admission control: rate limits, concurrency limits and the priority lane."""
+
+import asyncio
+
+import pytest
+
+import admission
+from auth import create_access_token
+from routes.terrain import thumbnail_path
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(admission, "_buckets", admission.TokenBuckets(rate=1000, burst=1000))
+    monkeypatch.setattr(admission, "_in_flight", {name: 0 for _, name, _, _ in admission.GUARDED_ROUTES})
+    monkeypatch.setattr(admission, "_total_in_flight", 0)
+    monkeypatch.setattr(admission, "_thread_budget", 32)
+
+
+class App:
+    """Downstream app whose requests stay in flight until released."""
+
+    def __init__(self, block: bool = True):
+        self.block = block
+        self.release = None
+
+    async def __call__(self, scope, receive, send):
+        if self.block:
+            await self.release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+async def request(middleware, path: str, token: str = None, ip: str = "10.0.0.1", query: bytes = b""):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query,
+        "headers": headers,
+        "client": (ip, 50000),
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware(scope, receive, send)
+    start = sent[0]
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}
+
+
+def run(scenario):
+    """Run scenario(middleware, app) with requests held in flight until it returns."""
+
+    async def main():
+        app = App()
+        app.release = asyncio.Event()
+        middleware = admission.AdmissionMiddleware(app)
+        try:
+            return await scenario(middleware, app)
+        finally:
+            app.release.set()
+            await asyncio.sleep(0)
+
+    return asyncio.run(main())
+
+
+async def hold(middleware, path: str, count: int, **kwargs) -> list:
+    """Start count requests and let them reach the downstream app."""
+    tasks = [asyncio.create_task(request(middleware, path, **kwargs)) for _ in range(count)]
+    await asyncio.sleep(0)
+    return tasks
+
+
+def test_rate_limit_answers_429_with_retry_after(enabled, monkeypatch):
+    monkeypatch.setattr(admission, "_buckets", admission.TokenBuckets(rate=0.5, burst=2))
+
+    async def scenario(middleware, app):
+        app.block = False
+        statuses = [(await request(middleware, "/api/terrain/generate"))[0] for _ in range(2)]
+        limited = await request(middleware, "/api/terrain/generate")
+        other_client = await request(middleware, "/api/terrain/generate", ip="10.0.0.2")
+        return statuses, limited, other_client
+
+    statuses, (status, headers), (other_status, _) = run(scenario)
+    assert statuses == [200, 200]
+    assert status == 429
+    assert headers["retry-after"] == "2"
+    assert other_status == 200
+
+
+def test_route_limit_sheds_with_503_and_keeps_priority_slots(enabled):
+    token = create_access_token(1, "alice")
+
+    async def scenario(middleware, app):
+        await hold(middleware, "/api/terrain/preview/draft", 2)
+        anonymous = await request(middleware, "/api/terrain/preview/draft")
+        priority = await hold(middleware, "/api/terrain/preview/draft", 2, token=token)
+        over_priority = await request(middleware, "/api/terrain/preview/draft", token=token)
+        app.release.set()
+        return anonymous, [(await task)[0] for task in priority], over_priority
+
+    (status, headers), priority, (over_status, _) = run(scenario)
+    assert status == 503
+    assert headers["retry-after"] == "1"
+    assert priority == [200, 200]
+    assert over_status == 503
+
+
+def test_guarded_routes_share_the_thread_budget(enabled, monkeypatch):
+    monkeypatch.setattr(admission, "_thread_budget", 6)
+    token = create_access_token(1, "alice")
+
+    async def scenario(middleware, app):
+        # Anonymous requests stop at the budget minus the priority reserve...
+        await hold(middleware, "/api/terrain/generate", 2)
+        await hold(middleware, "/api/courses/1/bundle", 2)
+        anonymous = await request(middleware, "/api/terrain/preview/draft")
+        # ...logged-in players get the reserve, then the budget is spent
+        await hold(middleware, "/api/terrain/preview/draft", 2, token=token)
+        spent = await request(middleware, "/api/terrain/preview/draft", token=token)
+        # Unguarded routes never count against it
+        app.block = False
+        unguarded = await request(middleware, "/api/holes")
+        return anonymous[0], spent[0], unguarded[0], admission._total_in_flight
+
+    assert run(scenario) == (503, 503, 200, 6)
+    assert admission._total_in_flight == 0
+
+
+def test_course_bundle_is_guarded():
+    assert admission._guarded_route("/api/courses/7/bundle")[0] == "course_bundle"
+    assert admission._guarded_route("/api/courses/7") is None
+    assert admission._guarded_route("/api/terrain/preview/draft")[0] == "terrain_draft"
+    assert admission._guarded_route("/api/terrain/previews") is None
+
+
+def test_cached_thumbnail_skips_admission(enabled):
+    path = thumbnail_path("aaaaaaaa", 12, 20)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"png")
+
+    async def scenario(middleware, app):
+        await hold(middleware, "/api/terrain/preview", 26)
+        app.block = False
+        cached = await request(middleware, "/api/terrain/preview", query=b"seed=aaaaaaaa&width=12&height=20")
+        uncached = await request(middleware, "/api/terrain/preview", query=b"seed=bbbbbbbb&width=12&height=20")
+        return cached[0], uncached[0]
+
+    try:
+        assert run(scenario) == (200, 503)
+    finally:
+        path.unlink()
+
+
+def test_thread_reserve_must_leave_threads(monkeypatch):
+    monkeypatch.setattr(admission, "_thread_budget", None)
+    monkeypatch.setattr(admission, "ADMISSION_THREAD_RESERVE", 40)
+
+    async def budget():
+        return admission.thread_budget()
+
+    with pytest.raises(ValueError, match="ADMISSION_THREAD_RESERVE"):
+        asyncio.run(budget())
+
+    monkeypatch.setattr(admission, "ADMISSION_THREAD_RESERVE", 8)
+    assert asyncio.run(budget()) == 32
+
+
+def test_rejections_carry_cors_headers(client, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(admission, "_buckets", admission.TokenBuckets(rate=1, burst=0))
+
+    response = client.get(
+        "/api/terrain/generate?seed=aaaaaaaa&width=12&height=20",
+        headers={"Origin": "http://localhost:5173"},
+    )
+    assert response.status_code == 429
+    assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert "retry-after" in response.headers
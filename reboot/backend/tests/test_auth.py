@@ -0,0 +1,75 @@
+"""Signup and login (bcrypt work is awaited, not run on a request thread) and the user cache."""
+
+import auth
+import cache
+from db import get_db
+
+
+def test_signup_login_and_me(client):
+    user = {"username": "carol", "email": "carol@example.com", "password": "hunter22"}
+    response = client.post("/api/auth/signup", json=user)
+    assert response.status_code == 201
+    assert response.json()["username"] == "carol"
+
+    assert client.post("/api/auth/signup", json=user).status_code == 409
+    taken_email = {**user, "username": "carol2"}
+    assert client.post("/api/auth/signup", json=taken_email).status_code == 409
+
+    bad = client.post("/api/auth/login", json={"username": "carol", "password": "wrong-pass"})
+    assert bad.status_code == 401
+
+    login = client.post("/api/auth/login", json={"username": "carol", "password": "hunter22"})
+    assert login.status_code == 200
+    token = login.json()["access_token"]
+    me = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.json()["email"] == "carol@example.com"
+
+
+def _rename(user_id: int, username: str) -> None:
+    with get_db() as conn:
+        conn.execute("UPDATE users SET username = ? WHERE id = ?", (username, user_id))
+
+
+def test_user_cache(seeded, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: clock[0])
+    user_cache = auth._user_cache
+    user_cache.clear()
+    alice_id = seeded["users"][0]
+    hits, misses = user_cache.hits, user_cache.misses
+
+    assert auth.get_user(alice_id)["username"] == "alice"
+    assert (user_cache.hits - hits, user_cache.misses - misses) == (0, 1)
+    user = auth.get_user(alice_id)
+    assert (user_cache.hits - hits, user_cache.misses - misses) == (1, 1)
+
+    # Callers get a copy, never the cached record itself
+    user["username"] = "mallory"
+    assert auth.get_user(alice_id)["username"] == "alice"
+
+    # Unknown users are not cached
+    assert auth.get_user(10**9) is None
+    assert 10**9 not in user_cache._data
+
+    try:
+        # A changed row is served stale until invalidated...
+        _rename(alice_id, "alice2")
+        assert auth.get_user(alice_id)["username"] == "alice"
+        auth.invalidate_user(alice_id)
+        assert auth.get_user(alice_id)["username"] == "alice2"
+
+        # ...or until the entry expires
+        _rename(alice_id, "alice3")
+        clock[0] += auth.USER_CACHE_TTL - 1
+        assert auth.get_user(alice_id)["username"] == "alice2"
+        clock[0] += 2
+        assert auth.get_user(alice_id)["username"] == "alice3"
+    finally:
+        _rename(alice_id, "alice")
+        auth.invalidate_user(alice_id)
+
+
+def test_decoded_tokens_are_copies():
+    token = auth.create_access_token(1, "alice")
+    auth.decode_access_token(token)["sub"] = "2"
+    assert auth.decode_access_token(token)["sub"] == "1"
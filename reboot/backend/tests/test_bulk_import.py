@@ -0,0 +1,127 @@
+"""bulk_import: timestamp normalisation and legacy id resolution."""
+
+import json
+
+import pytest
+
+import bulk_import
+import db
+import migrate
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch, capsys):
+    # A database of its own, so imported rows don't leak into other tests
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "import.db"))
+    migrate.run_all()
+    conn = bulk_import.open_import_connection()
+    conn.executemany(
+        "INSERT INTO users (username, email, password_hash) VALUES (?, ?, 'x')",
+        [("alice", "alice@example.com"), ("bob", "bob@example.com")],
+    )
+    capsys.readouterr()
+    yield conn
+    conn.close()
+
+
+def _import(conn, records: list[dict]) -> dict:
+    importer = bulk_import.BulkImporter(conn)
+    importer.add_lines(json.dumps(r) for r in records)
+    importer.flush()
+    return importer.summary()
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("2024-03-01 12:30:00", "2024-03-01 12:30:00"),
+    ("2024-03-01T12:30:00Z", "2024-03-01 12:30:00"),
+    ("2024-03-01T12:30:00.123Z", "2024-03-01 12:30:00"),
+    ("2024-03-01T14:30:00+02:00", "2024-03-01 12:30:00"),
+    (1709296200000, "2024-03-01 12:30:00"),
+    ("1709296200000", "2024-03-01 12:30:00"),
+])
+def test_normalize_timestamp(value, expected):
+    assert bulk_import.normalize_timestamp(value) == expected
+
+
+@pytest.mark.parametrize("value", ["yesterday", True, [2024]])
+def test_normalize_timestamp_rejects(value):
+    with pytest.raises(ValueError):
+        bulk_import.normalize_timestamp(value)
+
+
+def test_legacy_ids_resolve_through_the_import(conn):
+    summary = _import(conn, [
+        {"type": "user", "id": 40, "username": "bob"},
+        {"type": "user", "id": 41, "username": "nobody"},
+        {"type": "hole", "id": 7, "seed": "legacy01", "width": 10, "height": 12},
+        {"holeId": 7, "userId": 40, "createdAt": "2023-05-06T07:08:09Z",
+         "strokes": [{"startX": 1, "startY": 1, "endX": 2, "endY": 2}]},
+        {"holeId": 7, "userId": 40, "createdAt": 1683356889000, "strokes": []},
+        # Ids with no mapping in this import never match unrelated rows
+        {"holeId": 1, "userId": 40, "strokes": []},
+        {"holeId": 7, "userId": 1, "strokes": []},
+        {"holeId": 7, "userId": 40, "createdAt": "soon", "strokes": []},
+    ])
+    assert summary["hole_plays"] == 2
+    assert summary["skipped"] == 4
+    rows = conn.execute(
+        "SELECT h.seed, u.username, hp.created_at FROM hole_plays hp "
+        "JOIN holes h ON h.id = hp.hole_id JOIN users u ON u.id = hp.user_id ORDER BY hp.id"
+    ).fetchall()
+    assert [tuple(r) for r in rows] == [
+        ("legacy01", "bob", "2023-05-06 07:08:09"),
+        ("legacy01", "bob", "2023-05-06 07:08:09"),
+    ]
+
+
+def test_export_lines_import_by_natural_keys(conn):
+    _import(conn, [{"type": "hole", "seed": "export01", "width": 10, "height": 10}])
+    summary = _import(conn, [{
+        "id": 99, "hole_id": 99, "user_id": 99, "user_name": "alice",
+        "hole_seed": "export01", "hole_width": 10, "hole_height": 10,
+        "created_at": "2024-01-01 12:00:00", "strokes": 0, "moves": [],
+    }])
+    assert summary["hole_plays"] == 1
+    assert conn.execute("SELECT created_at FROM hole_plays").fetchone()[0] == "2024-01-01 12:00:00"
+
+
+def test_play_ids_are_never_reused(conn):
+    _import(conn, [{"type": "hole", "seed": "reuse001", "width": 10, "height": 10}])
+    play = {"user_name": "alice", "hole_seed": "reuse001", "hole_width": 10, "hole_height": 10, "moves": []}
+    _import(conn, [play, play])
+    conn.execute("DELETE FROM hole_plays")
+
+    _import(conn, [play])
+    assert conn.execute("SELECT id FROM hole_plays").fetchone()[0] == 3
+    # ...and the sequence has moved on, so ordinary inserts don't collide either
+    new_id = conn.execute(
+        "INSERT INTO hole_plays (hole_id, user_id, strokes) SELECT hole_id, user_id, 0 FROM hole_plays"
+    ).lastrowid
+    assert new_id == 4
+
+
+def test_import_route_reassembles_lines_across_chunks(client, conn, monkeypatch):
+    import auth
+
+    monkeypatch.setattr(auth, "ADMIN_USERNAMES", {"alice"})
+    alice_id = conn.execute("SELECT id FROM users WHERE username = 'alice'").fetchone()[0]
+    # Other tests may have cached a user with this id from the shared database
+    auth.invalidate_user(alice_id)
+    token = auth.create_access_token(alice_id, "alice")
+    body = "\n".join(json.dumps(r) for r in [
+        {"type": "hole", "seed": "chunks01", "width": 10, "height": 10},
+        {"user_name": "bob", "hole_seed": "chunks01", "hole_width": 10, "hole_height": 10,
+         "moves": [{"from_x": 1, "from_y": 2, "to_x": 3, "to_y": 4}]},
+    ]).encode()
+
+    def chunks():
+        for i in range(0, len(body), 7):
+            yield body[i:i + 7]
+
+    response = client.post(
+        "/api/admin/import", content=chunks(), headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    assert response.json()["hole_plays"] == 1
+    assert response.json()["moves"] == 1
@@ -0,0 +1,72 @@
+"""Courses: revisions, bundle caching and the terrain process pool behind bundles."""
+
+import pytest
+
+from auth import create_access_token
+from routes import terrain as terrain_routes
+from terrain import generate_full_terrain
+
+
+@pytest.fixture
+def headers(seeded) -> dict:
+    return {
+        name: {"Authorization": f"Bearer {create_access_token(user_id, name)}"}
+        for user_id, name in zip(seeded["users"], ("alice", "bob"))
+    }
+
+
+def test_create_and_update_course(client, seeded, headers):
+    holes = seeded["holes"]
+    created = client.post("/api/courses", json={"name": "Front", "hole_ids": holes[:2]}, headers=headers["alice"])
+    assert created.status_code == 201
+    course = created.json()
+    assert (course["revision"], course["hole_count"]) == (1, 2)
+    url = f"/api/courses/{course['id']}"
+
+    unknown = client.put(url, json={"hole_ids": [10**9]}, headers=headers["alice"])
+    assert unknown.status_code == 422
+    assert client.put(url, json={"name": "Mine"}, headers=headers["bob"]).status_code == 403
+
+    updated = client.put(url, json={"name": "Back", "hole_ids": holes[1:]}, headers=headers["alice"])
+    assert updated.status_code == 200
+    assert (updated.json()["name"], updated.json()["revision"], updated.json()["hole_count"]) == ("Back", 2, 3)
+    assert client.get(url).json()["revision"] == 2
+
+
+def test_bundle_etag_follows_the_revision(client, seeded, headers):
+    holes = seeded["holes"]
+    course = client.post("/api/courses", json={"name": "Bundle", "hole_ids": holes[:2]}, headers=headers["alice"]).json()
+    url = f"/api/courses/{course['id']}/bundle"
+
+    bundle = client.get(url)
+    assert bundle.status_code == 200
+    etag = bundle.headers["etag"]
+    first = bundle.json()["holes"][0]
+    expected = generate_full_terrain(first["seed"], first["width"], first["height"])
+    assert first["terrain"]["map"] == ["".join(row) for row in expected["map"]]
+    assert first["terrain"]["par"] == expected["par"]
+
+    # Unchanged: revalidated without a body, and served again from the cache
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    again = client.get(url)
+    assert (again.headers["etag"], again.content) == (etag, bundle.content)
+
+    client.put(f"/api/courses/{course['id']}", json={"hole_ids": holes[2:]}, headers=headers["alice"])
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert [h["id"] for h in changed.json()["holes"]] == holes[2:]
+
+
+def test_terrains_generated_on_the_pool_are_timed(monkeypatch):
+    monkeypatch.setattr(terrain_routes, "TERRAIN_WORKERS", 2)
+    keys = [("pool0001", 12, 20), ("pool0002", 20, 12), ("pool0003", 8, 8)]
+    timed = terrain_routes.GENERATION_SECONDS.count()
+    try:
+        terrains = terrain_routes.get_terrains(keys)
+        assert terrain_routes._pool is not None
+    finally:
+        terrain_routes.shutdown_pool()
+
+    assert terrains == [generate_full_terrain(*key) for key in keys]
+    assert terrain_routes.GENERATION_SECONDS.count() == timed + len(keys)
@@ -0,0 +1,42 @@
+"""Connection settings: pragma profiles and their validation at import."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import db
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _import_db(**env) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-c", "import db"],
+        cwd=BACKEND_DIR, env={**os.environ, **env}, capture_output=True, text=True,
+    )
+
+
+@pytest.mark.parametrize("env, message", [
+    ({"DB_PROFILE": "fast"}, "Invalid DB_PROFILE: fast (expected one of: safe, balanced, throughput)"),
+    ({"DB_SYNCHRONOUS": "sometimes"}, "Invalid DB_SYNCHRONOUS: SOMETIMES"),
+])
+def test_invalid_settings_fail_clearly(env, message):
+    result = _import_db(**env)
+    assert result.returncode != 0
+    assert f"ValueError: {message}" in result.stderr
+
+
+def test_profiles_are_case_insensitive():
+    assert _import_db(DB_PROFILE="Throughput").returncode == 0
+
+
+def test_profile_pragmas():
+    assert db.profile_pragmas("safe") == (
+        "PRAGMA synchronous=FULL",
+        "PRAGMA cache_size=-2048",
+        "PRAGMA mmap_size=0",
+        "PRAGMA busy_timeout=5000",
+    )
@@ -0,0 +1,26 @@
+"""GET /api/holeplays/export: keyset-paged NDJSON."""
+
+import json
+
+from routes import holeplays
+
+
+def _export(client, query: str = "") -> list[dict]:
+    response = client.get(f"/api/holeplays/export{query}")
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_pages_through_every_play(client, seeded, monkeypatch):
+    monkeypatch.setattr(holeplays, "EXPORT_PAGE_SIZE", 2)
+    plays = _export(client)
+    assert [p["id"] for p in plays] == sorted(seeded["plays"])
+    assert [len(p["moves"]) for p in plays] == [2, 1, 0]
+
+
+def test_export_filters_and_resumes(client, seeded, monkeypatch):
+    monkeypatch.setattr(holeplays, "EXPORT_PAGE_SIZE", 1)
+    first, second, third = sorted(seeded["plays"])
+    assert [p["id"] for p in _export(client, f"?after_id={first}")] == [second, third]
+    assert [p["id"] for p in _export(client, f"?hole_id={seeded['holes'][0]}")] == [first, second]
+    assert _export(client, "?until=2000-01-01T00:00:00") == []
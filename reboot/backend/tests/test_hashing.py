@@ -0,0 +1,46 @@
+"""Password hashing: a dead worker process must not break logins for good."""
+
+import asyncio
+
+import pytest
+
+import hashing
+
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    monkeypatch.setattr(hashing, "HASH_WORKERS", 1)
+    yield
+    hashing.shutdown()
+
+
+def test_hash_and_verify(process_pool):
+    hashed = asyncio.run(hashing.hash_password("secret"))
+    assert asyncio.run(hashing.verify_password("secret", hashed))
+    assert not asyncio.run(hashing.verify_password("wrong", hashed))
+
+
+def test_broken_pool_is_replaced(process_pool):
+    hashed = asyncio.run(hashing.hash_password("secret"))
+    broken = hashing._executor
+    for process in list(broken._processes.values()):
+        process.kill()
+        process.join()
+
+    assert asyncio.run(hashing.verify_password("secret", hashed))
+    assert hashing._executor is not None and hashing._executor is not broken
+
+
+def test_pool_that_keeps_breaking_answers_busy(monkeypatch):
+    class AlwaysBroken:
+        def submit(self, *args):
+            from concurrent.futures.process import BrokenProcessPool
+            raise BrokenProcessPool("worker died")
+
+        def shutdown(self, **kwargs):
+            pass
+
+    monkeypatch.setattr(hashing, "HASH_WORKERS", 1)
+    monkeypatch.setattr(hashing, "_get_executor", AlwaysBroken)
+    with pytest.raises(hashing.PoolBusy):
+        asyncio.run(hashing.hash_password("secret"))
@@ -0,0 +1,67 @@
+"""
+The list endpoints encode rows straight to JSON instead of going through
+their response models; these tests hold that output to the schemas.
+"""
+
+import pytest
+
+from schemas import HoleListResponse, HolePlayListResponse
+
+
+def _assert_matches(model, body: dict) -> None:
+    # Round-tripping through the model must give back exactly the same JSON:
+    # no missing or extra fields, and the same types
+    assert model.model_validate(body).model_dump(mode="json") == body
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "?limit=2&page=1",
+    "?sort=par&order=asc",
+    "?sort=distance",
+    "?min_fairway=0&max_water=1",
+    "?min_par=1&max_obstacles=1&sort=obstacles",
+])
+def test_list_holes_matches_schema(client, seeded, query):
+    response = client.get(f"/api/holes{query}")
+    assert response.status_code == 200
+    body = response.json()
+    _assert_matches(HoleListResponse, body)
+    assert body["holes"]
+
+
+def test_list_holes_features(client, seeded):
+    holes = {h["id"]: h for h in client.get("/api/holes?limit=100").json()["holes"]}
+    assert holes[seeded["holes"][-1]]["features"] is None
+    for hole_id in seeded["holes"][:-1]:
+        assert holes[hole_id]["features"]["par"] >= 1
+
+    # Feature filters only return holes that have features
+    filtered = client.get("/api/holes?min_par=1&limit=100").json()
+    assert {h["id"] for h in filtered["holes"]} == set(seeded["holes"][:-1])
+    assert filtered["total"] == len(seeded["holes"]) - 1
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "?limit=1&page=1",
+    "?sort=best",
+    "?hole_id={hole}",
+    "?user_id={user}&sort=best",
+])
+def test_list_hole_plays_matches_schema(client, seeded, query):
+    query = query.format(hole=seeded["holes"][0], user=seeded["users"][0])
+    response = client.get(f"/api/holeplays{query}")
+    assert response.status_code == 200
+    body = response.json()
+    _assert_matches(HolePlayListResponse, body)
+    assert body["hole_plays"]
+
+
+def test_list_hole_plays_moves(client, seeded):
+    body = client.get(f"/api/holeplays?hole_id={seeded['holes'][0]}&sort=best").json()
+    assert [p["strokes"] for p in body["hole_plays"]] == [1, 2]
+    moves = body["hole_plays"][1]["moves"]
+    assert [m["move_order"] for m in moves] == [0, 1]
+    assert [(m["from_x"], m["from_y"], m["to_x"], m["to_y"]) for m in moves] == [(1, 1, 1, 5), (1, 5, 3, 7)]
+    assert body["hole_plays"][1]["user_name"] == "alice"
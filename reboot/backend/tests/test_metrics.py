@@ -0,0 +1,13 @@
+"""Request metrics: labels stay bounded whatever clients send."""
+
+
+def test_unknown_methods_are_labelled_other(client):
+    for method in ("PURGE", "get", "X-SCAN-1"):
+        client.request(method, "/api/holes")
+    client.get("/api/holes")
+
+    exposition = client.get("/api/metrics").text
+    assert 'egolf_http_requests_total{method="OTHER",route="/api/holes"' in exposition
+    assert 'egolf_http_requests_total{method="GET",route="/api/holes"' in exposition
+    for method in ("PURGE", "get", "X-SCAN-1"):
+        assert f'method="{method}"' not in exposition
@@ -0,0 +1,50 @@
+"""Start-up migrations: SQL only, data migrations deferred, quick path engaged."""
+
+import pytest
+
+import db
+import migrate
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "migrate.db"))
+
+
+def _status(filename: str):
+    conn = db.get_connection()
+    try:
+        row = conn.execute("SELECT status FROM _migrations WHERE filename = ?", (filename,)).fetchone()
+        return row["status"] if row else None
+    finally:
+        conn.close()
+
+
+def _is_current() -> bool:
+    conn = db.get_connection()
+    try:
+        return migrate.schema_is_current(conn)
+    finally:
+        conn.close()
+
+
+def test_startup_defers_data_migrations_but_records_schema_version(fresh_db, capsys):
+    migrate.run_all(quick=True)
+    assert _status("004_backfill_hole_features.py") == "deferred"
+    assert _status("005_courses.sql") == "applied"
+    assert _is_current()
+
+    # Next boot: quick path, nothing printed
+    capsys.readouterr()
+    migrate.run_all(quick=True)
+    assert capsys.readouterr().out == ""
+
+    migrate.run_data()
+    assert _status("004_backfill_hole_features.py") == "applied"
+    assert _is_current()
+
+
+def test_full_run_applies_everything(fresh_db):
+    migrate.run_all()
+    assert _status("004_backfill_hole_features.py") == "applied"
+    assert _is_current()
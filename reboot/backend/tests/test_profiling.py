@@ -0,0 +1,73 @@
+"""Request profiling: the token gate, sampling and rotation of saved profiles."""
+
+import itertools
+import pstats
+import time
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import profiling
+
+
+async def lookup_dependency() -> int:
+    return 1
+
+
+def profiled_endpoint(value: int = Depends(lookup_dependency)) -> dict:
+    return {"value": value}
+
+
+@pytest.fixture
+def profiled(tmp_path, monkeypatch):
+    """A one-route app built with profiling enabled; returns (client, profile dir)."""
+    monkeypatch.setattr(profiling, "PROFILE_ENABLED", True)
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path / "profiles")
+    monkeypatch.setattr(profiling, "_sample_counter", itertools.count(1))
+
+    router = APIRouter(route_class=profiling.ProfiledRoute)
+    router.get("/profiled")(profiled_endpoint)
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(profiling.ProfilingMiddleware)
+    return TestClient(app), tmp_path / "profiles"
+
+
+def _profile_file(response):
+    return response.headers.get("x-profile-file")
+
+
+def test_token_gate(profiled):
+    client, profile_dir = profiled
+    assert _profile_file(client.get("/profiled")) is None
+    assert _profile_file(client.get("/profiled", headers={"X-Profile": "guess"})) is None
+
+    response = client.get("/profiled", headers={"X-Profile": "secret"})
+    assert response.json() == {"value": 1}
+    filename = _profile_file(response)
+    assert filename.endswith("_GET_profiled.pstats")
+
+    # The whole route handler is profiled, not only the endpoint
+    functions = {name for _, _, name in pstats.Stats(str(profile_dir / filename)).stats}
+    assert {"profiled_endpoint", "lookup_dependency", "serialize_response"} <= functions
+
+
+def test_sample_rate(profiled, monkeypatch):
+    client, _ = profiled
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 3)
+    sampled = [_profile_file(client.get("/profiled")) is not None for _ in range(6)]
+    assert sampled == [False, False, True, False, False, True]
+
+
+def test_only_the_newest_profiles_are_kept(profiled, monkeypatch):
+    client, profile_dir = profiled
+    monkeypatch.setattr(profiling, "PROFILE_MAX_FILES", 2)
+    names = []
+    for _ in range(4):
+        names.append(_profile_file(client.get("/profiled", headers={"X-Profile": "secret"})))
+        time.sleep(0.002)  # file names are stamped to the millisecond
+    assert len(set(names)) == 4
+    assert sorted(p.name for p in profile_dir.glob("*.pstats")) == sorted(names[-2:])
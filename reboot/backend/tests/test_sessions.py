@@ -0,0 +1,161 @@
+"""Play sessions: stroke validation against the frontend's dice rules, ownership and expiry."""
+
+import pytest
+
+import sessions
+from auth import create_access_token
+from db import get_db
+from routes import sessions as session_routes
+from sessions import InvalidStroke, PlaySession, SessionStore
+
+USER = {"id": 1, "username": "alice"}
+
+# Tile letters as in terrain.py: g grass, f fairway, s sand, t tree, w water
+GRID = (
+    "gggggggggggggggggggg",
+    "gggggggggggggggggggg",
+    "gggtggggggggggggwggg",
+    "ggggggggffffgggggggg",
+    "gggggggffffffggggggg",
+    "ggggggggffffgggggggg",
+    "ggssgggggggggggggggg",
+    "ggssgggggggggtgggggg",
+    "gggggggggggggggggggg",
+    "gggggggggggggggggggg",
+)
+
+
+def _session(ball, grid=GRID, hole=(19, 9)) -> PlaySession:
+    return PlaySession(USER, 1, grid, ball, hole)
+
+
+def _legal(session: PlaySession, to) -> bool:
+    try:
+        session.check_stroke(*to)
+        return True
+    except InvalidStroke:
+        return False
+
+
+@pytest.mark.parametrize("ball, max_roll", [((5, 5), 6), ((9, 4), 8), ((2, 6), 2)])
+def test_max_roll_follows_the_ball_tile(ball, max_roll):
+    assert _session(ball).max_roll == max_roll
+
+
+@pytest.mark.parametrize("ball", [(5, 5), (9, 4), (2, 6), (0, 0), (14, 2), (12, 7)])
+def test_legal_strokes_are_the_frontend_landing_positions(ball):
+    session = _session(ball)
+    reachable = {
+        position
+        for roll in range(1, session.max_roll + 1)
+        for position in session.landing_positions(roll)
+    }
+    assert reachable
+    legal = {
+        (x, y)
+        for y in range(session.height)
+        for x in range(session.width)
+        if (x, y) != ball and _legal(session, (x, y))
+    }
+    assert legal == reachable
+
+
+@pytest.mark.parametrize("ball, to, legal", [
+    # Grass: rolls up to 6, diagonals ceil(0.707 * roll) = 1..5
+    ((5, 5), (11, 5), True),
+    ((5, 5), (12, 5), False),
+    ((0, 0), (5, 5), True),
+    ((0, 0), (6, 6), False),
+    # Fairway: rolls up to 8, diagonals up to 6
+    ((9, 4), (17, 4), True),
+    ((9, 4), (18, 4), False),
+    ((9, 3), (15, 9), True),
+    # Sand: rolls up to 2, diagonals 1 and 2
+    ((2, 6), (2, 8), True),
+    ((2, 6), (2, 9), False),
+    ((2, 6), (4, 8), True),
+    # Trees, water, knight moves and the map edge
+    ((3, 0), (3, 2), False),
+    ((16, 0), (16, 2), False),
+    ((5, 5), (6, 7), False),
+    ((5, 5), (5, 10), False),
+])
+def test_check_stroke(ball, to, legal):
+    assert _legal(_session(ball), to) == legal
+
+
+def test_wasted_stroke_only_when_a_roll_has_nowhere_to_land():
+    assert not _legal(_session((5, 5)), (5, 5))
+
+    # Sand ringed by trees: a roll of 1 only reaches trees, a roll of 2 leaves the map
+    trapped = _session((1, 1), grid=("ttt", "tst", "ttt"), hole=(0, 0))
+    assert trapped.landing_positions(1) == []
+    assert _legal(trapped, (1, 1))
+
+
+def test_store_rejects_strokes_after_the_hole_or_close():
+    store = SessionStore()
+    session = _session((5, 5), hole=(8, 5))
+    store.add(session)
+    store.append_stroke(session, 8, 5)
+    assert session.at_hole and session.moves == [(5, 5, 8, 5)]
+    with pytest.raises(InvalidStroke, match="already in the hole"):
+        store.append_stroke(session, 9, 5)
+
+    other = _session((5, 5))
+    store.add(other)
+    store.remove(other.id)
+    with pytest.raises(InvalidStroke, match="closed"):
+        store.append_stroke(other, 6, 5)
+
+
+def test_idle_sessions_expire(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(sessions.time, "time", lambda: clock[0])
+    store = SessionStore(idle_seconds=60, maxsize=2)
+    idle, busy = _session((5, 5)), _session((5, 5))
+    store.add(idle)
+    store.add(busy)
+
+    clock[0] += 50
+    store.append_stroke(busy, 6, 5)
+    clock[0] += 20
+    assert store.get(idle.id) is None
+    assert store.get(busy.id) is busy
+
+    # Over maxsize, the least recently active session goes first
+    newer = _session((5, 5))
+    store.add(newer)
+    store.add(_session((5, 5)))
+    assert store.get(busy.id) is None and store.get(newer.id) is newer
+
+
+def test_session_routes(client, seeded, monkeypatch):
+    monkeypatch.setattr(
+        session_routes, "_session_terrain", lambda *key: (("gggggggggg",) * 3, (0, 1), (6, 1))
+    )
+    alice, bob = (
+        {"Authorization": f"Bearer {create_access_token(user_id, name)}"}
+        for user_id, name in zip(seeded["users"], ("alice", "bob"))
+    )
+    started = client.post("/api/sessions", json={"hole_id": seeded["holes"][3]}, headers=alice)
+    assert started.status_code == 201
+    session_id = started.json()["id"]
+    strokes = f"/api/sessions/{session_id}/strokes"
+
+    assert client.post(strokes, json={"to_x": 3, "to_y": 1}, headers=bob).status_code == 403
+    assert client.post(strokes, json={"to_x": 3, "to_y": 2}, headers=alice).status_code == 422
+    assert client.post(strokes, json={"to_x": 3, "to_y": 1}, headers=alice).json()["ball_position"] == [3, 1]
+    assert client.post(f"/api/sessions/{session_id}/finish", headers=alice).status_code == 409
+
+    assert client.post(strokes, json={"to_x": 6, "to_y": 1}, headers=alice).json()["at_hole"]
+    assert client.post(f"/api/sessions/{session_id}/finish", headers=bob).status_code == 403
+    finished = client.post(f"/api/sessions/{session_id}/finish", headers=alice)
+    assert finished.status_code == 201
+    try:
+        assert finished.json()["strokes"] == 2
+        assert client.get(f"/api/sessions/{session_id}").status_code == 404
+        assert client.post(f"/api/sessions/{session_id}/finish", headers=alice).status_code == 404
+    finally:
+        with get_db() as conn:
+            conn.execute("DELETE FROM hole_plays WHERE id = ?", (finished.json()["id"],))
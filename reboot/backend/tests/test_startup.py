@@ -0,0 +1,15 @@
+"""Start-up budget: importing `main` must stay fast and leave heavy modules unloaded."""
+
+import startup_budget
+
+
+def test_import_main_within_budget():
+    best = min(startup_budget.measure_import()[0] for _ in range(startup_budget.RUNS))
+    assert best <= startup_budget.DEFAULT_BUDGET_MS, (
+        f"import main took {best:.0f} ms (budget {startup_budget.DEFAULT_BUDGET_MS} ms)"
+    )
+
+
+def test_heavy_modules_are_lazy():
+    _, modules = startup_budget.measure_import()
+    assert startup_budget.eager_modules(modules) == []
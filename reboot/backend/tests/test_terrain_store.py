@@ -0,0 +1,70 @@
+"""Shared terrain store: round trip and eviction under its byte budget."""
+
+from terrain import generate_full_terrain
+from terrain_store import TerrainStore
+
+
+def test_round_trip(tmp_path):
+    store = TerrainStore(tmp_path / "store.db", max_bytes=1 << 20, version=1)
+    data = generate_full_terrain("roundtrp", 12, 9)
+    store.put(data)
+    assert store.get("roundtrp", 12, 9) == data
+    assert store.get("missing0", 12, 9) is None
+
+
+def test_evict_keeps_store_under_budget(tmp_path):
+    # 20 terrains of 100 bytes in a 1000-byte store
+    store = TerrainStore(tmp_path / "store.db", max_bytes=1000, version=1)
+    for i in range(20):
+        store.put(generate_full_terrain(f"evict{i:03d}", 10, 10))
+    store.evict()
+    assert store.size() <= 900
+    # Least recently used entries go first
+    assert store.get("evict019", 10, 10) is not None
+    assert store.get("evict000", 10, 10) is None
+
+    # A second evictor (another worker) finds nothing left to delete
+    other = TerrainStore(tmp_path / "store.db", max_bytes=1000, version=1)
+    size = other.size()
+    other.evict()
+    assert other.size() == size
+
+
+def _summed(store: TerrainStore) -> int:
+    return store._connect().execute("SELECT COALESCE(SUM(LENGTH(grid)), 0) FROM terrain").fetchone()[0]
+
+
+def test_size_is_a_running_total(tmp_path):
+    store = TerrainStore(tmp_path / "store.db", max_bytes=1000, version=1)
+    assert store.size() == 0
+    data = generate_full_terrain("running0", 10, 10)
+    store.put(data)
+    # The first writer wins; the ignored duplicate is not counted
+    store.put(data)
+    assert store.size() == _summed(store) == 100
+
+    for i in range(15):
+        store.put(generate_full_terrain(f"running{i + 1}", 10, 10))
+    store.evict()
+    assert store.size() == _summed(store) <= 900
+
+    # A new terrain generator empties the store, and the total with it
+    upgraded = TerrainStore(tmp_path / "store.db", max_bytes=1000, version=2)
+    assert upgraded.size() == _summed(upgraded) == 0
+
+
+def test_size_is_seeded_from_an_existing_store(tmp_path):
+    store = TerrainStore(tmp_path / "store.db", max_bytes=1 << 20, version=1)
+    for i in range(3):
+        store.put(generate_full_terrain(f"seeded{i:02d}", 10, 10))
+    # A store file from before the running total existed
+    store._connect().executescript("""
+        DROP TRIGGER terrain_size_insert;
+        DROP TRIGGER terrain_size_delete;
+        DROP TABLE terrain_size;
+    """)
+
+    reopened = TerrainStore(tmp_path / "store.db", max_bytes=1 << 20, version=1)
+    assert reopened.size() == 300
+    reopened.put(generate_full_terrain("seeded03", 10, 10))
+    assert reopened.size() == _summed(reopened) == 400